@@ -1,11 +1,10 @@
 import pandas as pd
 import numpy as np
-import joblib
 from sklearn.ensemble import IsolationForest
+from train_model import load_model
 
 # Load the trained model and scaler
-model = joblib.load('model/isolation_forest_model.pkl')
-scaler = joblib.load('model/scaler.pkl')
+model, scaler = load_model()
 
 # Load the training data
 df = pd.read_csv('sensor_data.csv')
@@ -1,10 +1,19 @@
-from flask import Flask, redirect, request, jsonify, render_template, send_file, Response, abort, send_from_directory
+from flask import Flask, redirect, request, jsonify, render_template, send_file, Response, abort, send_from_directory, stream_with_context
+import hmac
+import json
 import os
+import threading
 import pandas as pd
-import joblib
 from datetime import datetime
-import pickle
 from enhanced_anomaly_detector import EnhancedAnomalyDetector
+from binary_ingest import SENSOR_TYPE_CODES, BinaryIngestServer
+from inference_pool import InferencePool
+from sharding import ShardRouter
+from history_store import SensorHistoryStore
+from drift_retrainer import DriftMonitor
+from profiling import RequestProfiler
+from train_model import load_model
+from data_export import EXPORT_COLUMNS, EXPORT_FORMATS, ExportFilter, parquet_available, parse_time_bound, stream_export
 
 app = Flask(__name__)
 
@@ -18,24 +27,125 @@ FEATURE_MAP = {
     "Motion": "motion_01"
 }
 
-CSV_FILE = 'sensor_data.csv'
-MODEL_DIR = 'model/'
+CSV_FILE = os.environ.get('SENSOR_CSV', 'sensor_data.csv')
+# Sharded deployments give every shard its own MODEL_DIR so retrains stay local
+MODEL_DIR = os.path.join(os.environ.get('MODEL_DIR', 'model'), '')
+
+# Spawned worker processes (inference pool, retraining) re-run this file as
+# __mp_main__ when it is the entry script. They only need the worker functions,
+# so all stateful startup below is skipped for them.
+IS_WORKER_PROCESS = __name__ == '__mp_main__'
+
+# Serialises appends to CSV_FILE from request threads and the binary listener
+csv_lock = threading.Lock()
 
 # Load model and scaler once on startup
-try:
-    model = joblib.load(MODEL_DIR + "isolation_forest_model.pkl")
-    scaler = joblib.load(MODEL_DIR + "scaler.pkl")
-except Exception:
-    model = None
-    scaler = None
+model = None
+scaler = None
+if not IS_WORKER_PROCESS:
+    try:
+        model, scaler = load_model(MODEL_DIR)
+    except Exception:
+        pass
+
+# Optional process pool for model scoring, enabled with INFERENCE_WORKERS=<n>.
+# Started with the server below; created on first use under other WSGI servers.
+inference_pool = None
+_inference_pool_lock = threading.Lock()
+
+def get_inference_pool():
+    global inference_pool
+    workers = int(os.environ.get('INFERENCE_WORKERS', '0') or 0)
+    if workers <= 0:
+        return None
+    if inference_pool is None:
+        with _inference_pool_lock:
+            if inference_pool is None:
+                inference_pool = InferencePool(
+                    MODEL_DIR,
+                    workers=workers,
+                    batch_window=float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', '2')) / 1000.0
+                ).start()
+                if enhanced_detector is not None:
+                    enhanced_detector.inference = inference_pool
+                print(f"✅ Inference pool started with {workers} workers")
+    return inference_pool
+
+# Request profiling is only hooked in when PROFILE_ROUTES is set
+profiler = RequestProfiler.from_env() if not IS_WORKER_PROCESS else None
+if profiler is not None:
+    profiler.install(app)
+
+# Router mode: SHARD_NODES=<url>,<url>,... makes this process forward ingest to
+# the shard owning each sensor_id and merge dashboard queries across shards
+shard_router = ShardRouter(os.environ['SHARD_NODES'].split(',')) if os.environ.get('SHARD_NODES') and not IS_WORKER_PROCESS else None
+
+# Shard node mode: SHARD_NODE=1 (set by `python sharding.py cluster`) registers
+# the /api/shard/* maintenance endpoints that rebalancing uses
+shard_node = os.environ.get('SHARD_NODE') == '1'
+
+def shard_response(status, body):
+    return Response(body, status=status, mimetype='application/json')
+
+# Resident copy of the CSV history that dashboards and the detector read from.
+# The router holds no data of its own, so it skips loading one.
+history_store = SensorHistoryStore()
+if shard_router is None and not IS_WORKER_PROCESS and os.path.exists(CSV_FILE):
+    try:
+        loaded = history_store.load_csv(CSV_FILE)
+        print(f"✅ History store loaded {loaded} readings ({history_store.nbytes() / 1024:.0f} KiB)")
+        if history_store.skipped:
+            print(f"⚠️ Warning: {history_store.skipped} CSV rows have an unparseable timestamp or value "
+                  f"and are not shown on dashboards")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not load history store: {e}")
+
+def append_reading(row):
+    """Append one reading dict to the CSV and the history store"""
+    with csv_lock:
+        pd.DataFrame([row], columns=EXPORT_COLUMNS).to_csv(CSV_FILE, mode='a', index=False, header=not os.path.exists(CSV_FILE))
+        history_store.append(row['timestamp'], row['sensor_id'], row['sensor_type'], row['value'], row['anomaly'])
+
+def append_rows(df):
+    """Append a DataFrame of readings to the CSV and the history store"""
+    with csv_lock:
+        df.to_csv(CSV_FILE, mode='a', index=False, header=not os.path.exists(CSV_FILE))
+        history_store.append_frame(df)
+
+def format_timestamp(timestamp, fmt="%Y-%m-%dT%H:%M:%S"):
+    return timestamp.strftime(fmt) if timestamp is not None else ''
 
 # Initialize enhanced anomaly detector
-try:
-    enhanced_detector = EnhancedAnomalyDetector(CSV_FILE)
-    print("✅ Enhanced anomaly detector initialized")
-except Exception as e:
-    print(f"⚠️ Warning: Could not initialize enhanced detector: {e}")
-    enhanced_detector = None
+enhanced_detector = None
+if not IS_WORKER_PROCESS:
+    try:
+        enhanced_detector = EnhancedAnomalyDetector(CSV_FILE, history=history_store, model_dir=MODEL_DIR)
+        print("✅ Enhanced anomaly detector initialized")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not initialize enhanced detector: {e}")
+
+def swap_model(new_model, new_scaler):
+    """Point every scorer at a freshly retrained model; in-flight requests finish on the old one"""
+    global model, scaler
+    model, scaler = new_model, new_scaler
+    if enhanced_detector is not None:
+        enhanced_detector.model, enhanced_detector.scaler = new_model, new_scaler
+    if inference_pool is not None:
+        inference_pool.reload()
+
+# Drift monitoring over a window of recent readings. Retraining on a reservoir
+# sample in a background process when drift is detected is opt-in with DRIFT_RETRAIN=1.
+drift_monitor = None
+if shard_router is None and not IS_WORKER_PROCESS:
+    try:
+        drift_monitor = DriftMonitor(
+            MODEL_DIR,
+            check_interval=float(os.environ.get('DRIFT_CHECK_SECONDS', '30')),
+            retrain=os.environ.get('DRIFT_RETRAIN') == '1',
+            on_swap=swap_model
+        )
+    except Exception as e:
+        print(f"⚠️ Warning: Could not initialize drift monitor: {e}")
 
 @app.route('/')
 def home():
@@ -67,32 +177,26 @@ def react_build_static(filename):
 # API endpoint for sensor data (compatible with React frontend)
 @app.route('/api/sensors', methods=['GET'])
 def get_sensors():
+    if shard_router is not None:
+        return jsonify(shard_router.sensors())
     try:
-        if not os.path.exists(CSV_FILE):
-            return jsonify([])
-        
-        df = pd.read_csv(CSV_FILE)
-        if 'anomaly' not in df.columns:
-            df['anomaly'] = 0
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        df = df.sort_values('timestamp', ascending=True).tail(100)
+        # Latest reading per sensor type among the 100 newest readings
+        latest = {}
+        for record in history_store.tail(100):
+            latest[record.sensor_type] = record
 
-        # Group by sensor type and get latest readings
         sensors = []
-        for sensor_type in df['sensor_type'].unique():
-            sensor_data = df[df['sensor_type'] == sensor_type].iloc[-1]
-            
+        for sensor_type, sensor_data in latest.items():
             # Map sensor type to display name
             display_name = next((k for k, v in FEATURE_MAP.items() if v == sensor_type), sensor_type)
             
             sensors.append({
                 'id': f'sensor-{sensor_type}',
                 'type': display_name,
-                'value': float(sensor_data.get('value', 0)),
+                'value': sensor_data.value,
                 'unit': get_unit_for_sensor(display_name),
-                'timestamp': sensor_data['timestamp'].strftime("%Y-%m-%dT%H:%M:%S") if not pd.isnull(sensor_data['timestamp']) else '',
-                'isAnomaly': int(sensor_data.get('anomaly', 0)),
+                'timestamp': format_timestamp(sensor_data.timestamp),
+                'isAnomaly': sensor_data.anomaly,
                 'trend': 'stable',  # You can implement trend calculation
                 'icon': get_icon_for_sensor(display_name)
             })
@@ -104,28 +208,29 @@ def get_sensors():
 # API endpoint for historical data
 @app.route('/api/sensors/<sensor_id>/history', methods=['GET'])
 def get_sensor_history(sensor_id):
+    if shard_router is not None:
+        return jsonify({'error': 'History is not merged across shards; query the shard nodes directly'}), 501
+    try:
+        start = parse_time_bound(request.args.get('start'))
+        end = parse_time_bound(request.args.get('end'))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid time range: {str(e)}'}), 400
     try:
-        if not os.path.exists(CSV_FILE):
-            return jsonify([])
-        
-        df = pd.read_csv(CSV_FILE)
-        if 'anomaly' not in df.columns:
-            df['anomaly'] = 0
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        
         # Extract sensor type from sensor_id
         sensor_type = sensor_id.replace('sensor-', '')
         
-        # Filter data for this sensor type
-        sensor_data = df[df['sensor_type'] == sensor_type].tail(24)  # Last 24 readings
+        # Last 24 readings for this sensor type, optionally within ?start=&end=
+        if start is not None or end is not None:
+            sensor_data = history_store.window(start, end, sensor_type=sensor_type, limit=24)
+        else:
+            sensor_data = history_store.tail(24, sensor_type=sensor_type)
         
         history = []
-        for _, row in sensor_data.iterrows():
+        for row in sensor_data:
             history.append({
-                'timestamp': row['timestamp'].strftime("%H:%M") if not pd.isnull(row['timestamp']) else '',
-                'value': float(row.get('value', 0)),
-                'isAnomaly': int(row.get('anomaly', 0))
+                'timestamp': format_timestamp(row.timestamp, "%H:%M"),
+                'value': row.value,
+                'isAnomaly': row.anomaly
             })
         
         return jsonify(history)
@@ -155,48 +260,34 @@ def get_icon_for_sensor(sensor_type):
     }
     return icons.get(sensor_type, '📡')
 
-@app.route('/data', methods=['POST'])
-def receive_data():
-    data = request.get_json()
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    raw_sensor_type = data.get('sensor_type')
-    sensor_type = FEATURE_MAP.get(raw_sensor_type)
-    if sensor_type is None:
-        return jsonify({'error': f'Unsupported sensor_type: {raw_sensor_type}'}), 400
-
-    value = data.get('value')
-    sensor_id = data.get('sensor_id', 'unknown')
+class IngestError(Exception):
+    """Raised by process_reading when a reading cannot be scored"""
 
-    if value is None:
-        return jsonify({'error': "Missing 'value'"}), 400
 
+def score_reading(sensor_type, sensor_id, value, timestamp=None, statistical_anomaly=None):
+    """Score one reading without storing it; returns the CSV row and the /data response"""
     global model, scaler
+    if timestamp is None:
+        timestamp = datetime.now()
+    get_inference_pool()
     if model is None or scaler is None:
         try:
-            model = joblib.load(MODEL_DIR + 'isolation_forest_model.pkl')
-            scaler = joblib.load(MODEL_DIR + 'scaler.pkl')
+            model, scaler = load_model(MODEL_DIR)
         except Exception as e:
-            return jsonify({'error': f'Failed to load model/scaler: {str(e)}'}), 500
-
-    if os.path.exists(CSV_FILE):
-        all_data = pd.read_csv(CSV_FILE)
-    else:
-        columns = ['timestamp', 'sensor_id', 'sensor_type', 'value', 'anomaly']
-        all_data = pd.DataFrame(columns=columns)
+            raise IngestError(f'Failed to load model/scaler: {str(e)}')
 
     new_row = {
-        'timestamp': timestamp,
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
         'sensor_id': sensor_id,
         'sensor_type': sensor_type,
         'value': float(value),
         'anomaly': 0
     }
-    all_data = pd.concat([all_data, pd.DataFrame([new_row])], ignore_index=True)
 
     # Use enhanced anomaly detection if available
     if enhanced_detector is not None:
         try:
-            result = enhanced_detector.comprehensive_anomaly_detection(value, sensor_type)
+            result = enhanced_detector.comprehensive_anomaly_detection(value, sensor_type, statistical_anomaly)
             prediction = int(result['anomaly_detected'])
             
             # Add detailed anomaly information to the response
@@ -218,6 +309,10 @@ def receive_data():
     else:
         # Fallback to original Isolation Forest method
         try:
+            if os.path.exists(CSV_FILE):
+                all_data = pd.concat([pd.read_csv(CSV_FILE), pd.DataFrame([new_row])], ignore_index=True)
+            else:
+                all_data = pd.DataFrame([new_row])
             pivot_df = all_data.pivot_table(index='timestamp', columns='sensor_type', values='value', aggfunc='mean').fillna(0)
             latest_data = pivot_df.iloc[[-1]]
             latest_scaled = scaler.transform(latest_data)
@@ -227,21 +322,117 @@ def receive_data():
                 'message': 'Data received and prediction made (original method).'
             }
         except Exception as e:
-            return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
+            raise IngestError(f'Prediction failed: {str(e)}')
+
+    new_row['anomaly'] = prediction
+    return new_row, response_data
+
+def process_reading(sensor_type, sensor_id, value, timestamp=None):
+    """Score one reading and append it to the CSV"""
+    new_row, response_data = score_reading(sensor_type, sensor_id, value, timestamp)
+    # Append rather than rewrite so concurrent exports never see a truncated file
+    append_reading(new_row)
+    if drift_monitor is not None:
+        drift_monitor.observe(sensor_type, value)
+    return response_data
+
+@app.route('/data', methods=['POST'])
+def receive_data():
+    data = request.get_json()
+    raw_sensor_type = data.get('sensor_type')
+    sensor_type = FEATURE_MAP.get(raw_sensor_type)
+    if sensor_type is None:
+        return jsonify({'error': f'Unsupported sensor_type: {raw_sensor_type}'}), 400
+
+    value = data.get('value')
+    sensor_id = data.get('sensor_id', 'unknown')
+
+    if value is None:
+        return jsonify({'error': "Missing 'value'"}), 400
 
-    all_data.at[all_data.index[-1], 'anomaly'] = prediction
-    all_data.to_csv(CSV_FILE, index=False)
+    if shard_router is not None:
+        return shard_response(*shard_router.forward(shard_router.node_for(sensor_id), '/data', data))
+
+    try:
+        response_data = process_reading(sensor_type, sensor_id, value)
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 500
 
     return jsonify(response_data)
 
+def ingest_binary_batch(readings):
+    """Feed a decoded binary batch through the /data pipeline.
+
+    The Isolation Forest runs once per sensor type for the whole batch, each
+    reading is then scored and the batch is written with one CSV append, so
+    readings are scored against the history from before their batch.
+    Returns (accepted, anomalies) for the acknowledgement.
+    """
+    accepted = anomalies = 0
+    rows = []
+    valid = []
+    for reading in readings:
+        type_code = reading['type_code']
+        if type_code >= len(SENSOR_TYPE_CODES):
+            print(f"⚠️ Binary ingest: unknown type code {type_code} from {reading['sensor_id']}")
+            continue
+        valid.append(reading)
+
+    statistical = {}
+    if shard_router is None and enhanced_detector is not None:
+        by_type = {}
+        for i, reading in enumerate(valid):
+            by_type.setdefault(FEATURE_MAP[SENSOR_TYPE_CODES[reading['type_code']]], []).append(i)
+        for sensor_type, indexes in by_type.items():
+            flags = enhanced_detector.detect_statistical_anomalies([valid[i]['value'] for i in indexes], sensor_type)
+            statistical.update(zip(indexes, flags))
+
+    for i, reading in enumerate(valid):
+        type_code = reading['type_code']
+        if shard_router is not None:
+            payload = {'sensor_type': SENSOR_TYPE_CODES[type_code], 'sensor_id': reading['sensor_id'], 'value': reading['value']}
+            status, body = shard_router.forward(shard_router.node_for(reading['sensor_id']), '/data', payload)
+            if status == 200:
+                accepted += 1
+                anomalies += json.loads(body).get('anomaly', 0)
+            continue
+        sensor_type = FEATURE_MAP[SENSOR_TYPE_CODES[type_code]]
+        try:
+            row, result = score_reading(sensor_type, reading['sensor_id'], reading['value'], reading['timestamp'],
+                                        statistical.get(i))
+        except IngestError as e:
+            print(f"Binary ingest failed for {reading['sensor_id']}: {e}")
+            continue
+        rows.append(row)
+        anomalies += result['anomaly']
+
+    if rows:
+        append_rows(pd.DataFrame(rows, columns=EXPORT_COLUMNS))
+        if drift_monitor is not None:
+            for row in rows:
+                drift_monitor.observe(row['sensor_type'], row['value'])
+        accepted += len(rows)
+    return accepted, anomalies
+
+def start_binary_ingest():
+    """Start the optional binary listener when BINARY_TCP_PORT or BINARY_UDP_PORT is set"""
+    tcp_port = os.environ.get('BINARY_TCP_PORT')
+    udp_port = os.environ.get('BINARY_UDP_PORT')
+    if not tcp_port and not udp_port:
+        return None
+    server = BinaryIngestServer(
+        ingest_binary_batch,
+        host=os.environ.get('BINARY_HOST', '0.0.0.0'),
+        tcp_port=int(tcp_port) if tcp_port else None,
+        udp_port=int(udp_port) if udp_port else None,
+        udp_workers=int(os.environ.get('BINARY_UDP_WORKERS', '4'))
+    ).start()
+    print(f"✅ Binary ingest listening (tcp={server.tcp_port}, udp={server.udp_port})")
+    return server
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        with open(MODEL_DIR + "scaler.pkl", "rb") as s:
-            scaler = pickle.load(s)
-        with open(MODEL_DIR + "isolation_forest_model.pkl", "rb") as f:
-            model = pickle.load(f)
-
         data = request.get_json()
         sensor_type = data.get("sensor_type")
         value = data.get("value")
@@ -250,28 +441,42 @@ def predict():
         if sensor_type is None or value is None:
             return jsonify({"error": "Missing 'sensor_type' or 'value' in input JSON"}), 400
 
-        features = ['mq5_01']
-        feature_vector = {ft: 0.0 for ft in features}
+        if shard_router is not None:
+            return shard_response(*shard_router.forward(shard_router.node_for(sensor_id), '/predict', data))
+
         # Map input sensor_type to feature name
         feature_name = FEATURE_MAP.get(sensor_type, sensor_type)
-        if feature_name in features:
-            feature_vector[feature_name] = float(value)
 
-        df = pd.DataFrame([feature_vector])
-        X_scaled = scaler.transform(df)
-        prediction = model.predict(X_scaled)[0]
-        anomaly_flag = int(prediction == -1)
+        pool = get_inference_pool()
+        if pool is not None:
+            anomaly_flag = pool.predict_value(value, feature_name)
+        else:
+            # Use the resident model so background retraining swaps apply here too
+            current_model, current_scaler = model, scaler
+            if current_model is None or current_scaler is None:
+                current_model, current_scaler = load_model(MODEL_DIR)
+
+            features = ['mq5_01']
+            feature_vector = {ft: 0.0 for ft in features}
+            if feature_name in features:
+                feature_vector[feature_name] = float(value)
+
+            df = pd.DataFrame([feature_vector])
+            X_scaled = current_scaler.transform(df)
+            prediction = current_model.predict(X_scaled)[0]
+            anomaly_flag = int(prediction == -1)
         status = "Anomaly" if anomaly_flag else "Normal"
 
+        # Same column order as the CSV header, since appends are written without one
         record = {
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'sensor_type': feature_name,
             'sensor_id': sensor_id,
+            'sensor_type': feature_name,
             'value': float(value),
             'anomaly': anomaly_flag
         }
 
-        pd.DataFrame([record]).to_csv(CSV_FILE, mode='a', index=False, header=not os.path.exists(CSV_FILE))
+        append_reading(record)
 
         return jsonify({
             "sensor_id": sensor_id,
@@ -285,24 +490,17 @@ def predict():
 
 @app.route('/dashboard-data')
 def dashboard_data():
+    if shard_router is not None:
+        return jsonify(shard_router.dashboard_data())
     try:
-        if not os.path.exists(CSV_FILE):
-            return jsonify([])
-        df = pd.read_csv(CSV_FILE)
-        if 'anomaly' not in df.columns:
-            df['anomaly'] = 0
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        df = df.sort_values('timestamp', ascending=True).tail(100)
-
         result = []
-        for _, row in df.iterrows():
+        for row in history_store.tail(100):
             result.append({
-                'sensor_id': row.get('sensor_id', ''),
-                'sensor_type': row.get('sensor_type', ''),
-                'value': float(row.get('value', 0)),
-                'timestamp': row['timestamp'].strftime("%Y-%m-%dT%H:%M:%S") if not pd.isnull(row['timestamp']) else '',
-                'anomaly': int(row.get('anomaly', 0))
+                'sensor_id': row.sensor_id,
+                'sensor_type': row.sensor_type,
+                'value': row.value,
+                'timestamp': format_timestamp(row.timestamp),
+                'anomaly': row.anomaly
             })
         return jsonify(result)
     except Exception as e:
@@ -310,9 +508,121 @@ def dashboard_data():
 
 @app.route('/download')
 def download_file():
+    """Download sensor data, optionally filtered and streamed.
+
+    Query parameters: start, end, sensor_type, sensor_id, anomalies_only,
+    format (csv, ndjson, parquet) and gzip. Without any of them the raw
+    CSV file is sent as before.
+    """
+    if shard_router is not None:
+        return jsonify({'error': 'Downloads are not merged across shards; download from the shard nodes directly'}), 501
     if not os.path.exists(CSV_FILE):
         return "No data file found", 404
-    return send_file(CSV_FILE, as_attachment=True)
+    if not request.args:
+        return send_file(CSV_FILE, as_attachment=True)
+
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow'}), 400
+    try:
+        export_filter = ExportFilter.from_args(request.args, FEATURE_MAP)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'Invalid time range: {str(e)}'}), 400
+
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f'sensor_data.{extension}'
+    if use_gzip:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    stream = stream_export(CSV_FILE, export_filter, fmt, use_gzip)
+    response = Response(stream_with_context(stream), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+def require_admin():
+    """Admin endpoints need X-Admin-Token when ADMIN_TOKEN is set, otherwise a local caller"""
+    token = os.environ.get('ADMIN_TOKEN') or os.environ.get('PROFILE_TOKEN')
+    if token:
+        if request.headers.get('X-Admin-Token') != token:
+            abort(403)
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        abort(403)
+
+@app.route('/admin/profile')
+def admin_profile():
+    """Collapsed stacks from the request profiler; ?reset=1 clears them after reading"""
+    if profiler is None:
+        abort(404)
+    require_admin()
+    body = profiler.collapsed()
+    profiled = profiler.profiled_requests
+    if request.args.get('reset', '').lower() in ('1', 'true', 'yes'):
+        profiler.reset()
+    rv = Response(body, mimetype='text/plain')
+    rv.headers['X-Profiled-Requests'] = str(profiled)
+    return rv
+
+@app.route('/admin/drift', methods=['GET', 'POST'])
+def admin_drift():
+    """Current drift statistics; POST forces a background retrain on the reservoir"""
+    if drift_monitor is None:
+        abort(404)
+    require_admin()
+    if request.method == 'POST':
+        started = drift_monitor.trigger_retrain()
+        return jsonify({'retraining': started or drift_monitor.last_report.get('retraining', False), 'started': started})
+    return jsonify(drift_monitor.check())
+
+def require_shard_admin():
+    """Shard maintenance can delete data: it needs ADMIN_TOKEN itself, with no local or profiler-token fallback"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        abort(403)
+
+# Shard maintenance endpoints, used by `python sharding.py rebalance`. They are
+# registered below only on shard nodes.
+def shard_sensor_ids():
+    require_shard_admin()
+    return jsonify(history_store.sensor_ids())
+
+def shard_import():
+    require_shard_admin()
+    rows = (request.get_json() or {}).get('rows', [])
+    if not rows:
+        return jsonify({'imported': 0})
+    df = pd.DataFrame(rows, columns=EXPORT_COLUMNS)
+    append_rows(df)
+    return jsonify({'imported': len(df)})
+
+def shard_drop():
+    """Delete sensors from this shard; with expected_rows the drop is refused if the count changed"""
+    require_shard_admin()
+    data = request.get_json() or {}
+    sensor_ids = set(data.get('sensor_ids', []))
+    expected_rows = data.get('expected_rows')
+    if not sensor_ids or not os.path.exists(CSV_FILE):
+        return jsonify({'dropped': 0})
+    with csv_lock:
+        df = pd.read_csv(CSV_FILE, dtype={'sensor_id': str, 'sensor_type': str})
+        keep = ~df['sensor_id'].isin(sensor_ids)
+        if expected_rows is not None and int((~keep).sum()) != expected_rows:
+            # Rows arrived (or vanished) since the export: dropping now would lose them
+            return jsonify({'error': f'Expected {expected_rows} rows, found {int((~keep).sum())}'}), 409
+        # Write a new file and swap it in so running exports keep their snapshot
+        tmp_file = CSV_FILE + '.tmp'
+        df[keep].to_csv(tmp_file, index=False)
+        os.replace(tmp_file, CSV_FILE)
+        history_store.remove_sensors(sensor_ids)
+    return jsonify({'dropped': int((~keep).sum())})
+
+if shard_node:
+    app.add_url_rule('/api/shard/sensor-ids', view_func=shard_sensor_ids, methods=['GET'])
+    app.add_url_rule('/api/shard/import', view_func=shard_import, methods=['POST'])
+    app.add_url_rule('/api/shard/drop', view_func=shard_drop, methods=['POST'])
 
 @app.route('/add-sample-data')
 def add_sample_data():
@@ -325,7 +635,7 @@ def add_sample_data():
     now = datetime.now()
     
     for i in range(30):  # 30 data points
-        timestamp = now - timedelta(minutes=i*2)  # Every 2 minutes
+        timestamp = now - timedelta(minutes=(29 - i)*2)  # Every 2 minutes, oldest first
         value = random.uniform(20, 80)  # Random value between 20-80
         anomaly = 1 if random.random() < 0.1 else 0  # 10% chance of anomaly
         
@@ -338,8 +648,7 @@ def add_sample_data():
         })
     
     # Save to CSV
-    df = pd.DataFrame(sample_data)
-    df.to_csv(CSV_FILE, mode='a', index=False, header=not os.path.exists(CSV_FILE))
+    append_rows(pd.DataFrame(sample_data, columns=EXPORT_COLUMNS))
     
     return jsonify({
         'message': f'Added {len(sample_data)} sample data points',
@@ -386,7 +695,7 @@ def add_trend_test_data():
     base_value = 200  # Start at 200 ppm
     
     for i in range(10):  # 10 data points with increasing trend
-        timestamp = now - timedelta(minutes=i*2)  # Every 2 minutes
+        timestamp = now - timedelta(minutes=(9 - i)*2)  # Every 2 minutes, oldest first
         # Gradually increase from 200 to 600 ppm
         value = base_value + (i * 40) + random.uniform(-5, 5)  # Add some noise
         
@@ -399,8 +708,7 @@ def add_trend_test_data():
         })
     
     # Save to CSV
-    df = pd.DataFrame(trend_data)
-    df.to_csv(CSV_FILE, mode='a', index=False, header=not os.path.exists(CSV_FILE))
+    append_rows(pd.DataFrame(trend_data, columns=EXPORT_COLUMNS))
     
     return jsonify({
         'message': f'Added {len(trend_data)} trend test data points (gradual increase from {base_value} to {base_value + 360} ppm)',
@@ -438,4 +746,9 @@ def anomaly_mp3():
     return rv
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Only the reloader child serves requests, so bind the binary ports and
+    # warm the inference workers there rather than in the first request
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_binary_ingest()
+        get_inference_pool()
+    app.run(debug=True, port=int(os.environ.get("PORT", 5000)))
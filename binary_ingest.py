@@ -0,0 +1,254 @@
+"""
+Compact binary ingest protocol for low-power sensors.
+
+A batch is a 5-byte header followed by ``count`` fixed 29-byte frames, all
+little-endian:
+
+    header: magic b'SB' | version u8 | count u16
+    frame:  sensor_id 16s (ASCII, NUL padded) | type_code u8 |
+            timestamp u32 (epoch seconds, 0 = receive time) |
+            value f32 | sequence u32
+
+Over UDP each datagram carries exactly one batch. Over TCP batches are sent
+back to back and every batch is acknowledged with ``last_sequence u32 |
+accepted u16 | anomalies u16``. ``accepted`` counts only the readings that
+were stored, so a device should resend the batch when it is below the number
+of frames sent.
+"""
+
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from datetime import datetime
+
+MAGIC = b'SB'
+VERSION = 1
+HEADER = struct.Struct('<2sBH')
+FRAME = struct.Struct('<16sBIfI')
+ACK = struct.Struct('<IHH')
+MAX_BATCH = 2048  # keeps a UDP batch under the 64 KiB datagram limit
+
+# Wire type codes, in the same order as FEATURE_MAP in app.py
+SENSOR_TYPE_CODES = ("MQ-5", "Gas", "Temperature", "Humidity", "Pressure", "Light", "Motion")
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def encode_batch(readings):
+    """Encode (sensor_id, type_code, timestamp, value, sequence) tuples as one batch"""
+    if len(readings) > MAX_BATCH:
+        raise ProtocolError(f'Batch of {len(readings)} exceeds {MAX_BATCH} frames')
+    parts = [HEADER.pack(MAGIC, VERSION, len(readings))]
+    for sensor_id, type_code, timestamp, value, sequence in readings:
+        parts.append(FRAME.pack(sensor_id.encode('ascii'), type_code, int(timestamp), value, sequence))
+    return b''.join(parts)
+
+
+def decode_header(data):
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ProtocolError(f'Bad magic: {magic!r}')
+    if version != VERSION:
+        raise ProtocolError(f'Unsupported protocol version: {version}')
+    if count > MAX_BATCH:
+        raise ProtocolError(f'Batch of {count} exceeds {MAX_BATCH} frames')
+    return count
+
+
+def decode_frames(data, count, received_at=None):
+    """Decode ``count`` frames into reading dicts"""
+    if len(data) < count * FRAME.size:
+        raise ProtocolError('Truncated batch')
+    if received_at is None:
+        received_at = datetime.now()
+    readings = []
+    for sensor_id, type_code, timestamp, value, sequence in FRAME.iter_unpack(data[:count * FRAME.size]):
+        readings.append({
+            'sensor_id': sensor_id.rstrip(b'\0').decode('ascii', 'replace'),
+            'type_code': type_code,
+            'timestamp': datetime.fromtimestamp(timestamp) if timestamp else received_at,
+            'value': value,
+            'sequence': sequence
+        })
+    return readings
+
+
+def decode_batch(data):
+    count = decode_header(data)
+    return decode_frames(data[HEADER.size:], count)
+
+
+class _TCPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        while True:
+            header = _recv_exact(sock, HEADER.size)
+            if header is None:
+                return
+            try:
+                count = decode_header(header)
+                body = _recv_exact(sock, count * FRAME.size)
+                if body is None:
+                    return
+                readings = decode_frames(body, count)
+            except ProtocolError as e:
+                print(f"⚠️ Binary ingest: dropping TCP connection from {self.client_address[0]}: {e}")
+                return
+            accepted, anomalies = self.server.ingest.dispatch(readings)
+            last_sequence = readings[-1]['sequence'] if readings else 0
+            sock.sendall(ACK.pack(last_sequence, accepted, anomalies))
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data = self.request[0]
+        try:
+            readings = decode_batch(data)
+        except (ProtocolError, struct.error) as e:
+            print(f"⚠️ Binary ingest: dropping UDP datagram from {self.client_address[0]}: {e}")
+            return
+        self.server.ingest.dispatch(readings)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _PooledUDPServer(socketserver.UDPServer):
+    """UDP server handing datagrams to a fixed set of worker threads.
+
+    When the workers fall behind and the queue is full the serving thread
+    stops reading, so bursts back up into the kernel socket buffer instead of
+    starting a thread per datagram.
+    """
+    max_packet_size = HEADER.size + MAX_BATCH * FRAME.size
+
+    def __init__(self, server_address, handler_class, workers=4):
+        super().__init__(server_address, handler_class)
+        self._queue = queue.Queue(maxsize=workers * 16)
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def server_bind(self):
+        # A larger kernel buffer absorbs bursts while the workers catch up
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        self._queue.put((request, client_address))
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._workers:
+            self._queue.put(None)
+
+
+class BinaryIngestServer:
+    """TCP and/or UDP listener that hands decoded batches to ``handler``.
+
+    ``handler`` receives a list of reading dicts and returns an
+    ``(accepted, anomalies)`` pair: how many readings it stored and how many
+    of those were flagged. ``stats`` counts accepted readings, readings that
+    were dropped, and batches whose handler raised (``errors``).
+    """
+
+    def __init__(self, handler, host='0.0.0.0', tcp_port=None, udp_port=None, udp_workers=4):
+        self.handler = handler
+        self.host = host
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.udp_workers = udp_workers
+        self._servers = []
+        self.stats = {'batches': 0, 'readings': 0, 'dropped': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def dispatch(self, readings):
+        """Run the handler on one batch and return (accepted, anomalies) for the ACK"""
+        try:
+            accepted, anomalies = self.handler(readings)
+        except Exception as e:
+            print(f"Binary ingest handler failed: {e}")
+            with self._stats_lock:
+                self.stats['errors'] += 1
+                self.stats['dropped'] += len(readings)
+            return 0, 0
+        with self._stats_lock:
+            self.stats['batches'] += 1
+            self.stats['readings'] += accepted
+            self.stats['dropped'] += len(readings) - accepted
+        return accepted, anomalies
+
+    def start(self):
+        if self.tcp_port is not None:
+            self._serve(_ThreadingTCPServer((self.host, self.tcp_port), _TCPHandler))
+            self.tcp_port = self._servers[-1].server_address[1]
+        if self.udp_port is not None:
+            self._serve(_PooledUDPServer((self.host, self.udp_port), _UDPHandler, self.udp_workers))
+            self.udp_port = self._servers[-1].server_address[1]
+        return self
+
+    def _serve(self, server):
+        server.ingest = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers.append(server)
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+
+class BinaryIngestClient:
+    """Minimal sender used by the loopback harness and load tests"""
+
+    def __init__(self, host, port, transport='tcp'):
+        self.transport = transport
+        if transport == 'tcp':
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.connect((host, port))
+
+    def send(self, readings):
+        """Send one batch; over TCP returns the (last_sequence, accepted, anomalies) ack"""
+        self.sock.sendall(encode_batch(readings))
+        if self.transport == 'tcp':
+            ack = _recv_exact(self.sock, ACK.size)
+            if ack is None:
+                raise ConnectionError('Connection closed before acknowledgement')
+            return ACK.unpack(ack)
+        return None
+
+    def close(self):
+        self.sock.close()
@@ -1,7 +1,6 @@
-import joblib
+from train_model import load_model
 
-# Load the model and scaler using joblib
-model = joblib.load("model/isolation_forest_model.pkl")
-scaler = joblib.load("model/scaler.pkl")
+# Load the live model and scaler pair
+model, scaler = load_model()
 
 print("✅ Model and scaler loaded successfully.")
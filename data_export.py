@@ -0,0 +1,218 @@
+import io
+import json
+import zlib
+import pandas as pd
+
+EXPORT_COLUMNS = ['timestamp', 'sensor_id', 'sensor_type', 'value', 'anomaly']
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+CHUNK_ROWS = 10000
+
+
+def parse_time_bound(value):
+    """Parse a start/end query value into a naive Timestamp.
+
+    Stored timestamps are naive server time, so timezone-aware bounds are
+    rejected up front rather than failing mid-stream on comparison.
+    """
+    if not value:
+        return None
+    timestamp = pd.Timestamp(value)
+    if pd.isnull(timestamp):
+        raise ValueError(f'Invalid timestamp: {value!r}')
+    if timestamp.tzinfo is not None:
+        raise ValueError(f'Timezone-aware timestamps are not supported: {value!r}')
+    return timestamp
+
+
+class ExportFilter:
+    """Row filter for a streaming export, built from request query arguments"""
+
+    def __init__(self, start=None, end=None, sensor_type=None, sensor_id=None, anomalies_only=False):
+        self.start = parse_time_bound(start)
+        self.end = parse_time_bound(end)
+        self.sensor_type = sensor_type
+        self.sensor_id = sensor_id
+        self.anomalies_only = anomalies_only
+
+    @classmethod
+    def from_args(cls, args, feature_map=None):
+        """Build a filter from a Flask ``request.args`` mapping"""
+        sensor_type = args.get('sensor_type')
+        if sensor_type and feature_map:
+            # Accept display names ("MQ-5", "Temperature") as well as stored types
+            sensor_type = feature_map.get(sensor_type, sensor_type)
+        anomalies_only = args.get('anomalies_only', '').lower() in ('1', 'true', 'yes')
+        return cls(args.get('start'), args.get('end'), sensor_type, args.get('sensor_id'), anomalies_only)
+
+    def apply(self, chunk):
+        if 'anomaly' not in chunk.columns:
+            chunk['anomaly'] = 0
+        # Blank or malformed cells become NaT/NaN (written as null) and a blank flag means normal
+        chunk['anomaly'] = pd.to_numeric(chunk['anomaly'], errors='coerce').fillna(0).astype(int)
+        chunk['value'] = pd.to_numeric(chunk['value'], errors='coerce')
+        chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], errors='coerce')
+
+        mask = pd.Series(True, index=chunk.index)
+        if self.start is not None:
+            mask &= chunk['timestamp'] >= self.start
+        if self.end is not None:
+            mask &= chunk['timestamp'] <= self.end
+        if self.sensor_type:
+            mask &= chunk['sensor_type'] == self.sensor_type
+        if self.sensor_id:
+            mask &= chunk['sensor_id'] == self.sensor_id
+        if self.anomalies_only:
+            mask &= chunk['anomaly'] == 1
+        return chunk.loc[mask, EXPORT_COLUMNS]
+
+
+def iter_filtered_chunks(csv_file, export_filter, chunksize=CHUNK_ROWS):
+    """Yield filtered DataFrame chunks from the CSV without loading it whole.
+
+    Only the bytes present when the export starts are read, so rows appended
+    by concurrent ingest never produce a torn final line.
+    """
+    with open(csv_file, 'rb') as f:
+        snapshot = io.BufferedReader(_BoundedReader(f, _file_size(f)))
+        # Force string ids so numeric-looking ids ("1001") still match the filter
+        for chunk in pd.read_csv(snapshot, chunksize=chunksize, dtype={'sensor_id': str, 'sensor_type': str}):
+            chunk = export_filter.apply(chunk)
+            if not chunk.empty:
+                yield chunk
+
+
+def _file_size(f):
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+
+class _BoundedReader(io.RawIOBase):
+    """Raw reader that stops at a fixed byte offset"""
+
+    def __init__(self, f, limit):
+        self._f = f
+        self._remaining = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._remaining <= 0:
+            return 0
+        data = self._f.read(min(len(b), self._remaining))
+        n = len(data)
+        b[:n] = data
+        self._remaining -= n
+        return n
+
+
+def _format_timestamps(chunk):
+    chunk = chunk.copy()
+    chunk['timestamp'] = chunk['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return chunk
+
+
+def _csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        yield _format_timestamps(chunk).to_csv(index=False, header=header).encode('utf-8')
+        header = False
+    if header:
+        yield (','.join(EXPORT_COLUMNS) + '\n').encode('utf-8')
+
+
+def _ndjson_stream(chunks):
+    for chunk in chunks:
+        chunk = _format_timestamps(chunk)
+        lines = []
+        for record in chunk.to_dict(orient='records'):
+            # NaN is not valid JSON, so missing cells go out as null
+            record = {k: None if pd.isna(v) else v for k, v in record.items()}
+            if record['value'] is not None:
+                record['value'] = float(record['value'])
+            record['anomaly'] = int(record['anomaly'])
+            lines.append(json.dumps(record))
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only buffer whose contents are handed out as they are produced"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer.extend(b)
+        return len(b)
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _parquet_stream(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('timestamp', pa.timestamp('s')),
+        ('sensor_id', pa.string()),
+        ('sensor_type', pa.string()),
+        ('value', pa.float64()),
+        ('anomaly', pa.int8()),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks:
+            # Ids are already strings from read_csv; casting would turn blanks into "nan"
+            chunk = chunk.astype({'value': float, 'anomaly': 'int8'})
+            # One row group per chunk so data leaves the process as it is filtered
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _gzip_stream(stream):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def stream_export(csv_file, export_filter, fmt='csv', gzip=False):
+    """Return an iterator of encoded bytes for the filtered export"""
+    chunks = iter_filtered_chunks(csv_file, export_filter)
+    if fmt == 'ndjson':
+        stream = _ndjson_stream(chunks)
+    elif fmt == 'parquet':
+        stream = _parquet_stream(chunks)
+    else:
+        stream = _csv_stream(chunks)
+    if gzip:
+        stream = _gzip_stream(stream)
+    return stream
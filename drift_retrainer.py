@@ -0,0 +1,234 @@
+"""
+Drift monitoring and background retraining of the Isolation Forest.
+
+Every ingested reading goes into two buffers for its sensor type: a sliding
+window of the most recent readings and a bounded reservoir sample used as
+training data. A background thread periodically compares each trained feature's recent window
+against the training statistics stored in the scaler, so a shift shows up
+within ``window`` readings however long the process has been running:
+
+    mean shift     |live mean - training mean| in training standard deviations
+    std ratio      live std / training std
+    anomaly rate   share of the window the current model flags, compared to
+                   the contamination it was trained with
+
+When drift begins, or a metric crosses its threshold that had not yet in
+the current episode, the reservoirs restart so they hold only readings from
+after the change; once they have
+``min_samples`` readings the model is refit on them in a separate process,
+saved as a new model version and handed to ``on_swap``. The windows are
+cleared at the swap, so drift is next measured only on readings scored
+against the new baseline. Ingest keeps scoring with the old model the whole
+time.
+"""
+
+import multiprocessing
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from train_model import fit_model, load_model, save_model
+
+
+class ReservoirSample:
+    """Uniform fixed-size sample of a stream (Vitter's Algorithm R)"""
+
+    def __init__(self, capacity, rng=None):
+        self.capacity = capacity
+        self.items = []
+        self.seen = 0
+        self._rng = rng or random.Random()
+
+    def add(self, value):
+        self.seen += 1
+        if len(self.items) < self.capacity:
+            self.items.append(value)
+        else:
+            j = self._rng.randrange(self.seen)
+            if j < self.capacity:
+                self.items[j] = value
+
+    def values(self):
+        return np.array(self.items, dtype=float)
+
+
+def _retrain(samples, model_dir, contamination):
+    """Runs in the retraining process: fit on the reservoir and save it as the live version"""
+    pivot_df = pd.DataFrame(samples)
+    model, scaler = fit_model(pivot_df, contamination=contamination)
+    save_model(model, scaler, model_dir)
+    return len(pivot_df)
+
+
+class DriftMonitor:
+    def __init__(self, model_dir='model/', capacity=2000, window=1000, min_samples=500, check_interval=30.0,
+                 mean_shift=0.5, std_ratio=(0.5, 2.0), anomaly_rate_shift=0.10, cooldown=600.0,
+                 retrain=False, on_swap=None):
+        self.model_dir = model_dir
+        self.capacity = capacity
+        self.window = window
+        self.min_samples = min_samples
+        self.check_interval = check_interval
+        self.thresholds = {
+            'mean_shift': mean_shift,
+            'std_ratio': std_ratio,
+            'anomaly_rate_shift': anomaly_rate_shift
+        }
+        self.cooldown = cooldown
+        self.retrain = retrain
+        self.on_swap = on_swap
+        self.reservoirs = {}
+        self.recent = {}
+        self.last_report = {}
+        self.retrain_count = 0
+        self.last_retrain_at = 0.0
+        self.drift_since = None
+        self._drift_reasons = set()  # (feature, metric) pairs flagged in the current episode
+        self._lock = threading.Lock()
+        self._retraining = False
+        self._executor = None
+        self._thread = None
+        self.model = None
+        self.scaler = None
+        self.load_models()
+
+    def load_models(self):
+        self.model, self.scaler = load_model(self.model_dir)
+
+    @property
+    def features(self):
+        return list(getattr(self.scaler, 'feature_names_in_', []))
+
+    def observe(self, sensor_type, value):
+        """Record one reading in its type's window and reservoir; cheap enough for the ingest path"""
+        with self._lock:
+            # Started on first use so spawned worker processes importing the app don't run checks
+            if self._thread is None:
+                self.start()
+            reservoir = self.reservoirs.get(sensor_type)
+            if reservoir is None:
+                reservoir = self.reservoirs[sensor_type] = ReservoirSample(self.capacity)
+            reservoir.add(float(value))
+            recent = self.recent.get(sensor_type)
+            if recent is None:
+                recent = self.recent[sensor_type] = deque(maxlen=self.window)
+            recent.append(float(value))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                report = self.check()
+                if report.get('drift') and self.retrain:
+                    self.trigger_retrain()
+            except Exception as e:
+                print(f"Drift check failed: {e}")
+
+    def check(self):
+        """Compare each trained feature's recent window with the training statistics"""
+        model, scaler = self.model, self.scaler
+        report = {'drift': False, 'features': {}}
+        for i, feature in enumerate(self.features):
+            with self._lock:
+                values = np.array(self.recent.get(feature, ()), dtype=float)
+            stats = {'samples': int(len(values))}
+            report['features'][feature] = stats
+            if len(values) < self.min_samples:
+                continue
+
+            train_mean, train_std = float(scaler.mean_[i]), float(scaler.scale_[i])
+            stats['mean'] = float(values.mean())
+            stats['std'] = float(values.std())
+            stats['mean_shift'] = abs(stats['mean'] - train_mean) / train_std
+            stats['std_ratio'] = stats['std'] / train_std
+
+            # Score the window with only this feature set, the way /predict does
+            X = np.zeros((len(values), len(self.features)))
+            X[:, i] = values
+            flagged = model.predict(scaler.transform(pd.DataFrame(X, columns=self.features))) == -1
+            stats['anomaly_rate'] = float(flagged.mean())
+
+            reasons = []
+            if stats['mean_shift'] > self.thresholds['mean_shift']:
+                reasons.append('mean_shift')
+            low, high = self.thresholds['std_ratio']
+            if not low <= stats['std_ratio'] <= high:
+                reasons.append('std_ratio')
+            contamination = getattr(model, 'contamination', 'auto')
+            if contamination != 'auto' and abs(stats['anomaly_rate'] - contamination) > self.thresholds['anomaly_rate_shift']:
+                reasons.append('anomaly_rate')
+            stats['drift'] = reasons
+            report['drift'] = report['drift'] or bool(reasons)
+
+        reasons = {(feature, reason) for feature, stats in report['features'].items()
+                   for reason in stats.get('drift', [])}
+        with self._lock:
+            if not reasons:
+                self.drift_since = None
+                self._drift_reasons = set()
+            elif reasons - self._drift_reasons:
+                # Drift began or took a new form. The reservoirs hold mostly readings
+                # from before it, so restart them and a retrain fits only the new data.
+                self.drift_since = time.time()
+                self.reservoirs = {}
+                self._drift_reasons |= reasons
+            report['drift_since'] = self.drift_since
+        report['retraining'] = self._retraining
+        report['retrain_count'] = self.retrain_count
+        self.last_report = report
+        return report
+
+    def trigger_retrain(self):
+        """Start a background refit unless one is running or the cooldown hasn't passed"""
+        with self._lock:
+            if self._retraining or time.time() - self.last_retrain_at < self.cooldown:
+                return False
+            samples = {f: self.reservoirs[f].values() for f in self.features
+                       if f in self.reservoirs and len(self.reservoirs[f].items) >= self.min_samples}
+            if len(samples) != len(self.features):
+                return False
+            # Features are trained side by side, so truncate to a common length
+            n = min(len(v) for v in samples.values())
+            samples = {f: v[:n] for f, v in samples.items()}
+            self._retraining = True
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        contamination = getattr(self.model, 'contamination', 0.05)
+        print(f"🔁 Retraining on {n} reservoir samples in the background")
+        future = self._executor.submit(_retrain, samples, self.model_dir, contamination)
+        future.add_done_callback(self._retrain_done)
+        return True
+
+    def _retrain_done(self, future):
+        try:
+            n = future.result()
+            self.load_models()
+            with self._lock:
+                # Start over so drift is next measured only on readings from after the swap
+                self.reservoirs = {}
+                self.recent = {}
+                self.drift_since = None
+                self._drift_reasons = set()
+                self.retrain_count += 1
+                self.last_retrain_at = time.time()
+            print(f"✅ Retrained model on {n} samples, swapping it in")
+            if self.on_swap is not None:
+                self.on_swap(self.model, self.scaler)
+        except Exception as e:
+            print(f"❌ Background retraining failed: {e}")
+            with self._lock:
+                self.last_retrain_at = time.time()
+        finally:
+            with self._lock:
+                self._retraining = False
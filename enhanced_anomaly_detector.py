@@ -1,16 +1,19 @@
 import pandas as pd
 import numpy as np
-import joblib
 from sklearn.ensemble import IsolationForest
 from datetime import datetime, timedelta
 import warnings
+from train_model import load_model
 warnings.filterwarnings('ignore')
 
 class EnhancedAnomalyDetector:
-    def __init__(self, csv_file='sensor_data.csv'):
+    def __init__(self, csv_file='sensor_data.csv', history=None, model_dir='model/'):
         self.csv_file = csv_file
+        self.model_dir = model_dir
+        self.history = history  # Optional SensorHistoryStore read instead of the CSV
         self.model = None
         self.scaler = None
+        self.inference = None  # Optional InferencePool used instead of in-process scoring
         self.load_models()
         
         # Thresholds for different detection methods
@@ -26,16 +29,29 @@ class EnhancedAnomalyDetector:
     def load_models(self):
         """Load the trained Isolation Forest model and scaler"""
         try:
-            self.model = joblib.load('model/isolation_forest_model.pkl')
-            self.scaler = joblib.load('model/scaler.pkl')
+            self.model, self.scaler = load_model(self.model_dir)
             print("✅ Models loaded successfully")
         except Exception as e:
             print(f"⚠️ Warning: Could not load models: {e}")
             self.model = None
             self.scaler = None
     
+    def recent_readings(self, sensor_type, count):
+        """Timestamps and values of the last ``count`` readings of a sensor type"""
+        if self.history is not None:
+            return self.history.values(count, sensor_type)
+        df = pd.read_csv(self.csv_file)
+        sensor_data = df[df['sensor_type'] == sensor_type].tail(count)
+        return list(pd.to_datetime(sensor_data['timestamp'])), sensor_data['value'].astype(float).values
+
     def detect_statistical_anomaly(self, value, sensor_type='mq5_01'):
         """Detect anomalies using Isolation Forest (original method)"""
+        if self.inference is not None and sensor_type in self.inference.features:
+            try:
+                return self.inference.predict_value(value, sensor_type) == 1
+            except Exception as e:
+                print(f"Inference pool error, scoring in-process: {e}")
+
         if self.model is None or self.scaler is None:
             return False
         
@@ -53,6 +69,30 @@ class EnhancedAnomalyDetector:
             print(f"Statistical anomaly detection error: {e}")
             return False
     
+    def detect_statistical_anomalies(self, values, sensor_type='mq5_01'):
+        """detect_statistical_anomaly for many readings of one type, scored in one model call"""
+        if self.inference is not None and sensor_type in self.inference.features:
+            try:
+                # Submitted together so the pool coalesces them into one batch
+                futures = [self.inference.submit_value(value, sensor_type) for value in values]
+                return [future.result(5.0) == 1 for future in futures]
+            except Exception as e:
+                print(f"Inference pool error, scoring in-process: {e}")
+
+        if self.model is None or self.scaler is None:
+            return [False] * len(values)
+
+        try:
+            features = {'mq5_01': np.zeros(len(values))}
+            features[sensor_type] = np.asarray(values, dtype=float)
+
+            df = pd.DataFrame(features)
+            scaled_data = self.scaler.transform(df)
+            return [bool(flag) for flag in self.model.predict(scaled_data) == -1]
+        except Exception as e:
+            print(f"Statistical anomaly detection error: {e}")
+            return [False] * len(values)
+
     def detect_absolute_threshold_anomaly(self, value):
         """Detect anomalies based on absolute thresholds"""
         value = float(value)
@@ -73,14 +113,11 @@ class EnhancedAnomalyDetector:
         
         try:
             # Load recent data
-            df = pd.read_csv(self.csv_file)
-            sensor_data = df[df['sensor_type'] == sensor_type].tail(window + 1)
+            _, values = self.recent_readings(sensor_type, window + 1)
             
-            if len(sensor_data) < window:
+            if len(values) < window:
                 return False, 'INSUFFICIENT_DATA'
             
-            values = sensor_data['value'].astype(float).values
-            
             # Check for consecutive increases
             consecutive_increases = 0
             for i in range(1, len(values)):
@@ -109,18 +146,13 @@ class EnhancedAnomalyDetector:
     def detect_velocity_anomaly(self, sensor_type='mq5_01', window=3):
         """Detect anomalies based on rate of change (velocity)"""
         try:
-            df = pd.read_csv(self.csv_file)
-            sensor_data = df[df['sensor_type'] == sensor_type].tail(window + 1)
+            timestamps, values = self.recent_readings(sensor_type, window + 1)
             
-            if len(sensor_data) < 2:
+            if len(values) < 2:
                 return False, 'INSUFFICIENT_DATA'
             
-            # Calculate rate of change
-            values = sensor_data['value'].astype(float).values
-            timestamps = pd.to_datetime(sensor_data['timestamp'])
-            
             # Calculate ppm per minute
-            time_diff = (timestamps.iloc[-1] - timestamps.iloc[0]).total_seconds() / 60
+            time_diff = (timestamps[-1] - timestamps[0]).total_seconds() / 60
             value_diff = values[-1] - values[0]
             velocity = value_diff / time_diff if time_diff > 0 else 0
             
@@ -134,8 +166,12 @@ class EnhancedAnomalyDetector:
             print(f"Velocity anomaly detection error: {e}")
             return False, 'ERROR'
     
-    def comprehensive_anomaly_detection(self, value, sensor_type='mq5_01'):
-        """Comprehensive anomaly detection using all methods"""
+    def comprehensive_anomaly_detection(self, value, sensor_type='mq5_01', statistical_anomaly=None):
+        """Comprehensive anomaly detection using all methods.
+
+        ``statistical_anomaly`` may be passed in when it was already computed
+        for a whole batch with detect_statistical_anomalies.
+        """
         results = {
             'value': value,
             'sensor_type': sensor_type,
@@ -154,7 +190,8 @@ class EnhancedAnomalyDetector:
         }
         
         # Method 2: Statistical Anomaly Detection
-        statistical_anomaly = self.detect_statistical_anomaly(value, sensor_type)
+        if statistical_anomaly is None:
+            statistical_anomaly = self.detect_statistical_anomaly(value, sensor_type)
         results['details']['statistical'] = {
             'detected': bool(statistical_anomaly),
             'type': 'ISOLATION_FOREST'
@@ -0,0 +1,265 @@
+"""
+Resident, array-backed history of sensor readings.
+
+Readings are grouped into one series per (sensor_id, sensor_type). Each
+series keeps int64 epoch-second timestamps and float32 values in growable
+NumPy arrays, kept sorted by time so slicing is a binary search, plus the
+anomaly flags packed into a bitmap. Sensor ids and types are interned to
+small integer codes. Compared to re-reading the CSV into an object-dtype
+DataFrame per request this costs about 13 bytes per reading.
+
+Rows whose timestamp or value cannot be parsed have nothing to store, so
+they are left out and counted in ``skipped``. They are still in the CSV and
+in /download exports, so dashboards show fewer readings than the export
+when ``skipped`` is non-zero.
+"""
+
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+HistoryRecord = namedtuple('HistoryRecord', ['timestamp', 'sensor_id', 'sensor_type', 'value', 'anomaly'])
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(timestamp):
+    """Naive datetime (or anything pandas can parse) to epoch seconds, treating it as UTC"""
+    if not isinstance(timestamp, datetime):
+        timestamp = pd.Timestamp(timestamp).to_pydatetime()
+    return int((timestamp - _EPOCH).total_seconds())
+
+
+def from_epoch(seconds):
+    return _EPOCH + timedelta(seconds=int(seconds))
+
+
+class _Series:
+    __slots__ = ('id_code', 'type_code', 'size', 'timestamps', 'values', 'anomaly_bits')
+
+    def __init__(self, id_code, type_code, capacity):
+        self.id_code = id_code
+        self.type_code = type_code
+        self.size = 0
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty(capacity, dtype=np.float32)
+        self.anomaly_bits = np.zeros((capacity + 7) // 8, dtype=np.uint8)
+
+    def _reserve(self, needed):
+        capacity = len(self.timestamps)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('timestamps', 'values'):
+            old = getattr(self, name)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+        bits = np.zeros((capacity + 7) // 8, dtype=np.uint8)
+        bits[:len(self.anomaly_bits)] = self.anomaly_bits
+        self.anomaly_bits = bits
+
+    def anomalies(self, start, stop):
+        first = start >> 3
+        bits = np.unpackbits(self.anomaly_bits[first:(stop + 7) >> 3], bitorder='little')
+        return bits[start - (first << 3):stop - (first << 3)]
+
+    def _write_anomalies(self, start, flags):
+        """Overwrite the flags from ``start`` on, touching only the bitmap bytes that cover them"""
+        stop = start + len(flags)
+        first, last = start >> 3, (stop + 7) >> 3
+        bits = np.unpackbits(self.anomaly_bits[first:last], bitorder='little')
+        bits[start - (first << 3):stop - (first << 3)] = flags
+        self.anomaly_bits[first:last] = np.packbits(bits, bitorder='little')
+
+    def extend(self, timestamps, values, anomalies):
+        """Append readings; the arrays must already be sorted by timestamp"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        if self.size and timestamps[0] < self.timestamps[self.size - 1]:
+            self._merge(timestamps, values, anomalies)
+            return
+        self._reserve(self.size + n)
+        end = self.size + n
+        self.timestamps[self.size:end] = timestamps
+        self.values[self.size:end] = values
+        self._write_anomalies(self.size, anomalies)
+        self.size = end
+
+    def append(self, timestamp, value, anomaly):
+        if self.size and timestamp < self.timestamps[self.size - 1]:
+            self._merge(np.array([timestamp]), np.array([value]), np.array([anomaly]))
+            return
+        self._reserve(self.size + 1)
+        i = self.size
+        self.timestamps[i] = timestamp
+        self.values[i] = value
+        if anomaly:
+            self.anomaly_bits[i >> 3] |= np.uint8(1 << (i & 7))
+        self.size += 1
+
+    def _merge(self, timestamps, values, anomalies):
+        """Insert late readings (sorted); only the readings after the earliest of them move"""
+        pos = int(np.searchsorted(self.timestamps[:self.size], timestamps[0], side='right'))
+        tail = self.timestamps[pos:self.size]
+        # Each late reading goes after existing readings with the same timestamp
+        at = np.searchsorted(tail, timestamps, side='right')
+        merged_ts = np.insert(tail, at, timestamps)
+        merged_values = np.insert(self.values[pos:self.size], at, values)
+        merged_flags = np.insert(self.anomalies(pos, self.size), at, np.asarray(anomalies, dtype=np.uint8))
+        end = self.size + len(timestamps)
+        self._reserve(end)
+        self.timestamps[pos:end] = merged_ts
+        self.values[pos:end] = merged_values
+        self._write_anomalies(pos, merged_flags)
+        self.size = end
+
+    def bounds(self, start=None, end=None):
+        ts = self.timestamps[:self.size]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = self.size if end is None else int(np.searchsorted(ts, end, side='right'))
+        return lo, hi
+
+    def nbytes(self):
+        return self.timestamps.nbytes + self.values.nbytes + self.anomaly_bits.nbytes
+
+
+class SensorHistoryStore:
+    def __init__(self, initial_capacity=64):
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._series = {}  # (id_code, type_code) -> _Series
+        self._id_codes = {}
+        self._id_names = []
+        self._type_codes = {}
+        self._type_names = []
+        self.skipped = 0  # rows left out for an unparseable timestamp or value
+
+    def _intern(self, codes, names, name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _series_for(self, sensor_id, sensor_type):
+        key = (self._intern(self._id_codes, self._id_names, str(sensor_id)),
+               self._intern(self._type_codes, self._type_names, str(sensor_type)))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(key[0], key[1], self.initial_capacity)
+        return series
+
+    def load_csv(self, csv_file, chunksize=100000):
+        """Bulk-load a sensor CSV; rows with unparseable timestamps or values are skipped"""
+        loaded = 0
+        # String ids, so a column with blanks doesn't turn "1001" into "1001.0"
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, dtype={'sensor_id': str, 'sensor_type': str}):
+            loaded += self.append_frame(chunk)
+        return loaded
+
+    def append_frame(self, df):
+        """Append rows from a DataFrame with the sensor CSV columns; returns how many were stored"""
+        timestamps = pd.to_datetime(df['timestamp'], errors='coerce')
+        values = pd.to_numeric(df['value'], errors='coerce')
+        valid = timestamps.notna() & values.notna()
+        skipped = int(len(df) - valid.sum())
+        if skipped:
+            with self._lock:
+                self.skipped += skipped
+        if not valid.any():
+            return 0
+        df = pd.DataFrame({
+            'ts': timestamps[valid].values.astype('datetime64[s]').astype(np.int64),
+            'sensor_id': df.loc[valid, 'sensor_id'].astype(str).values,
+            'sensor_type': df.loc[valid, 'sensor_type'].astype(str).values,
+            'value': values[valid].values.astype(np.float32),
+            'anomaly': (df.loc[valid, 'anomaly'].fillna(0).astype(int).values if 'anomaly' in df.columns
+                        else np.zeros(int(valid.sum()), dtype=int))
+        }).sort_values('ts', kind='stable')
+        with self._lock:
+            for (sensor_id, sensor_type), group in df.groupby(['sensor_id', 'sensor_type'], sort=False):
+                self._series_for(sensor_id, sensor_type).extend(
+                    group['ts'].values, group['value'].values, group['anomaly'].values.astype(np.uint8))
+        return len(df)
+
+    def append(self, timestamp, sensor_id, sensor_type, value, anomaly=0):
+        with self._lock:
+            self._series_for(sensor_id, sensor_type).append(to_epoch(timestamp), float(value), int(anomaly))
+
+    def remove_sensors(self, sensor_ids):
+        with self._lock:
+            codes = {self._id_codes[s] for s in sensor_ids if s in self._id_codes}
+            for key in [k for k in self._series if k[0] in codes]:
+                del self._series[key]
+
+    def sensor_ids(self):
+        with self._lock:
+            return sorted({self._id_names[id_code] for id_code, _ in self._series})
+
+    def _matching(self, sensor_type=None, sensor_id=None):
+        type_code = self._type_codes.get(sensor_type) if sensor_type is not None else None
+        id_code = self._id_codes.get(sensor_id) if sensor_id is not None else None
+        if (sensor_type is not None and type_code is None) or (sensor_id is not None and id_code is None):
+            return []
+        return [s for s in self._series.values()
+                if (type_code is None or s.type_code == type_code) and (id_code is None or s.id_code == id_code)]
+
+    def _collect(self, slices, limit=None):
+        """Merge (series, lo, hi) slices into time-ordered records, keeping the newest ``limit``"""
+        if not slices:
+            return []
+        ts = np.concatenate([s.timestamps[lo:hi] for s, lo, hi in slices])
+        values = np.concatenate([s.values[lo:hi] for s, lo, hi in slices])
+        flags = np.concatenate([s.anomalies(lo, hi) for s, lo, hi in slices])
+        owner = np.concatenate([np.full(hi - lo, i, dtype=np.int32) for i, (_, lo, hi) in enumerate(slices)])
+        order = np.argsort(ts, kind='stable')
+        if limit is not None:
+            order = order[-limit:]
+        return [
+            HistoryRecord(
+                from_epoch(ts[i]),
+                self._id_names[slices[owner[i]][0].id_code],
+                self._type_names[slices[owner[i]][0].type_code],
+                float(str(values[i])),  # shortest repr of the float32, e.g. 203.26 not 203.2599945
+                int(flags[i])
+            )
+            for i in order
+        ]
+
+    def tail(self, n, sensor_type=None, sensor_id=None):
+        """The newest ``n`` readings, oldest first, optionally for one sensor type or id"""
+        with self._lock:
+            slices = [(s, max(0, s.size - n), s.size) for s in self._matching(sensor_type, sensor_id)]
+            return self._collect(slices, n)
+
+    def window(self, start=None, end=None, sensor_type=None, sensor_id=None, limit=None):
+        """Readings with start <= timestamp <= end, oldest first; bounds are located by binary search"""
+        start = to_epoch(start) if start is not None else None
+        end = to_epoch(end) if end is not None else None
+        with self._lock:
+            slices = []
+            for s in self._matching(sensor_type, sensor_id):
+                lo, hi = s.bounds(start, end)
+                if limit is not None:
+                    lo = max(lo, hi - limit)
+                slices.append((s, lo, hi))
+            return self._collect(slices, limit)
+
+    def values(self, n, sensor_type):
+        """Timestamps and values of the newest ``n`` readings of one type, for the detector"""
+        records = self.tail(n, sensor_type=sensor_type)
+        return [r.timestamp for r in records], np.array([r.value for r in records], dtype=float)
+
+    def __len__(self):
+        with self._lock:
+            return sum(s.size for s in self._series.values())
+
+    def nbytes(self):
+        with self._lock:
+            return sum(s.nbytes() for s in self._series.values())
@@ -0,0 +1,163 @@
+"""
+Process pool for Isolation Forest scoring.
+
+Each worker process loads its own copy of the live scaler and model pair
+from ``model_dir`` once at startup; an Isolation Forest is small enough that
+the copies are cheap.
+Requests arriving within ``batch_window`` seconds are coalesced into one
+``predict`` call, so scoring uses every core while request threads only
+enqueue a feature vector and wait on a future.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+import warnings
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import joblib
+import numpy as np
+
+from train_model import model_paths
+
+# Per-process state, filled in by _init_worker
+_model = None
+_scaler = None
+
+
+def _init_worker(model_path, scaler_path):
+    global _model, _scaler
+    warnings.filterwarnings('ignore')
+    _model = joblib.load(model_path)
+    _scaler = joblib.load(scaler_path)
+
+
+def _score_batch(rows):
+    """Return 1 for anomalous rows and 0 otherwise"""
+    X = _scaler.transform(np.asarray(rows, dtype=np.float64))
+    return (_model.predict(X) == -1).astype(np.int8).tolist()
+
+
+class InferencePool:
+    def __init__(self, model_dir, workers=None, features=('mq5_01',),
+                 batch_window=0.002, max_batch=512):
+        self.model_dir = model_dir
+        self.workers = workers or multiprocessing.cpu_count()
+        self.features = tuple(features)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._executor = self._new_executor()
+        self._running = True
+        self._thread = threading.Thread(target=self._coalesce, daemon=True)
+        self._thread.start()
+        return self
+
+    def _new_executor(self):
+        # spawn, not fork: the parent is a threaded web server
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=model_paths(self.model_dir)
+        )
+        # Warm every worker up front so the first requests don't pay for the model load
+        list(executor.map(_score_batch, [[[0.0] * len(self.features)]] * self.workers))
+        return executor
+
+    def reload(self):
+        """Swap in workers that load the live model pair; in-flight batches finish on the old pool"""
+        old, self._executor = self._executor, self._new_executor()
+        old.shutdown(wait=False)
+
+    def submit(self, row):
+        """Queue one feature vector (ordered like ``features``) and return a Future of 0/1"""
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=5.0):
+        return self.submit(row).result(timeout)
+
+    def submit_value(self, value, sensor_type):
+        """Queue a single reading, building its feature vector the way /predict does"""
+        row = [0.0] * len(self.features)
+        if sensor_type in self.features:
+            row[self.features.index(sensor_type)] = float(value)
+        return self.submit(row)
+
+    def predict_value(self, value, sensor_type, timeout=5.0):
+        return self.submit_value(value, sensor_type).result(timeout)
+
+    def _coalesce(self):
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._running = False
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        futures = [future for _, future in batch]
+        rows = [row for row, _ in batch]
+        try:
+            result = self._submit(rows)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def _fan_out(done):
+            try:
+                predictions = done.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+
+        result.add_done_callback(_fan_out)
+
+    def _submit(self, rows):
+        try:
+            return self._executor.submit(_score_batch, rows)
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory) and took the pool down with it.
+            # The batch that was running failed; start fresh workers for the rest.
+            print("⚠️ Inference worker died, restarting the pool")
+            old, self._executor = self._executor, self._new_executor()
+            old.shutdown(wait=False)
+            return self._executor.submit(_score_batch, rows)
+        except RuntimeError:
+            # Raced with reload() shutting the old executor down
+            return self._executor.submit(_score_batch, rows)
+
+    def shutdown(self):
+        self._running = False
+        self._queue.put(None)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Synthetic sensor fleet and load driver
+
+Simulates a fleet of sensors across every FEATURE_MAP type and drives the
+running app with their readings while polling the dashboards, then reports
+throughput, error rates and latency percentiles per endpoint.
+
+Requests follow a fixed schedule and latency is measured from each request's
+scheduled send time, not from when it was actually sent. When the server
+falls behind, the time requests spend waiting for their turn counts toward
+the percentiles instead of silently slowing the load down (coordinated
+omission); the report also shows how far the achieved rate fell short.
+
+Usage:
+    python load_generator.py --sensors 50 --rate 200 --duration 30
+    python load_generator.py --targets data,predict,binary --binary-port 9000
+"""
+
+import argparse
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from binary_ingest import BinaryIngestClient, SENSOR_TYPE_CODES
+
+# Realistic operating point per display type: (baseline, noise std, unit)
+SENSOR_PROFILES = {
+    'Gas': (150.0, 12.0, 'ppm'),
+    'Temperature': (22.0, 0.4, '°C'),
+    'Humidity': (45.0, 1.5, '%'),
+    'Pressure': (101.3, 0.15, 'kPa'),
+    'Light': (300.0, 25.0, 'lux'),
+    'Motion': (2.0, 1.0, 'events/min'),
+}
+SENSOR_PROFILES['MQ-5'] = SENSOR_PROFILES['Gas']
+
+DASHBOARD_PATHS = ['/dashboard-data', '/api/sensors', '/api/sensors/sensor-mq5_01/history']
+
+
+class SimulatedSensor:
+    """One sensor: baseline with noise, slow drift, occasional spikes and trend episodes"""
+
+    def __init__(self, sensor_id, sensor_type, rng, spike_rate=0.01, trend_rate=0.002):
+        self.sensor_id = sensor_id
+        self.sensor_type = sensor_type
+        self.type_code = SENSOR_TYPE_CODES.index(sensor_type)
+        baseline, noise, _ = SENSOR_PROFILES[sensor_type]
+        self.rng = rng
+        self.baseline = baseline * rng.uniform(0.9, 1.1)
+        self.noise = noise
+        self.drift = 0.0
+        self.spike_rate = spike_rate
+        self.trend_rate = trend_rate
+        self.trend_steps = 0
+        self.trend_elapsed = 0
+        self.trend_slope = 0.0
+        self.sequence = 0
+
+    def next_value(self):
+        self.sequence += 1
+        # Random-walk drift, bounded to a few noise widths around the baseline
+        self.drift += self.rng.gauss(0, self.noise * 0.02)
+        self.drift = max(-3 * self.noise, min(3 * self.noise, self.drift))
+
+        if self.trend_steps == 0 and self.rng.random() < self.trend_rate:
+            self.trend_steps = self.rng.randint(5, 20)
+            self.trend_elapsed = 0
+            self.trend_slope = self.baseline * self.rng.uniform(0.02, 0.08)
+        trend = 0.0
+        if self.trend_steps:
+            self.trend_steps -= 1
+            self.trend_elapsed += 1
+            trend = self.trend_slope * self.trend_elapsed
+
+        value = self.baseline + self.drift + trend + self.rng.gauss(0, self.noise)
+        if self.rng.random() < self.spike_rate:
+            value += self.baseline * self.rng.uniform(1.5, 6.0)
+        return max(0.0, round(value, 2))
+
+
+def build_fleet(count, seed=None):
+    rng = random.Random(seed)
+    sensor_types = [t for t in SENSOR_TYPE_CODES if t != 'MQ-5']  # MQ-5 and Gas share a feature
+    fleet = []
+    for i in range(count):
+        sensor_type = sensor_types[i % len(sensor_types)]
+        sensor_id = f"{sensor_type.lower()}_{i:04d}"
+        fleet.append(SimulatedSensor(sensor_id, sensor_type, random.Random(rng.random())))
+    return fleet
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and error collector"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.readings = defaultdict(int)
+
+    def record(self, name, latency, ok, readings=1):
+        with self.lock:
+            self.latencies[name].append(latency)
+            self.readings[name] += readings
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed):
+        print(f"\n📊 Load test results ({elapsed:.1f}s)")
+        print("=" * 86)
+        print(f"{'endpoint':<40}{'reqs':>8}{'req/s':>9}{'rd/s':>9}{'err%':>7}"
+              f"{'p50':>7}{'p90':>7}{'p99':>7}{'max':>7}  (ms)")
+        with self.lock:
+            for name in sorted(self.latencies):
+                samples = sorted(self.latencies[name])
+                n = len(samples)
+                print(f"{name:<40}{n:>8}{n / elapsed:>9.1f}{self.readings[name] / elapsed:>9.1f}"
+                      f"{100.0 * self.errors[name] / n:>7.1f}"
+                      f"{_percentile(samples, 50):>7.1f}{_percentile(samples, 90):>7.1f}"
+                      f"{_percentile(samples, 99):>7.1f}{samples[-1] * 1000:>7.1f}")
+
+
+def _percentile(sorted_samples, pct):
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_samples)) - 1))
+    return sorted_samples[index] * 1000
+
+
+class HttpDriver:
+    """Keep-alive HTTP client, one per worker thread"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status < 400
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            return False
+
+
+def _paced(rate, stop, worker):
+    """Call ``worker(scheduled_at)`` until ``stop`` is set, pacing the units it returns to ``rate`` per second.
+
+    The schedule never slips: a worker that falls behind sends back to back,
+    and each call gets the time it should have started so latency includes
+    the wait.
+    """
+    interval = 1.0 / rate
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        next_at += interval * worker(next_at)
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def ingest_worker(args, sensors, rate, recorder, stop, rng):
+    http_driver = HttpDriver(args.url, args.timeout)
+    binary = None
+    targets = [t for t in args.targets if t in ('data', 'predict', 'binary')]
+    turn = 0
+
+    def send_one(scheduled_at):
+        nonlocal turn
+        target = targets[turn % len(targets)]
+        turn += 1
+        if target == 'binary':
+            return send_binary_batch(scheduled_at)
+        sensor = rng.choice(sensors)
+        payload = {'sensor_type': sensor.sensor_type, 'sensor_id': sensor.sensor_id, 'value': sensor.next_value()}
+        ok = http_driver.request('POST', f'/{target}', payload)
+        recorder.record(f'POST /{target}', time.perf_counter() - scheduled_at, ok)
+        return 1
+
+    def send_binary_batch(scheduled_at):
+        nonlocal binary
+        batch = []
+        now = int(time.time())
+        for _ in range(args.binary_batch):
+            s = rng.choice(sensors)
+            batch.append((s.sensor_id, s.type_code, now, s.next_value(), s.sequence))
+        try:
+            if binary is None:
+                binary = BinaryIngestClient(urlsplit(args.url).hostname, args.binary_port, 'tcp')
+            binary.send(batch)
+            ok = True
+        except OSError:
+            binary = None
+            ok = False
+        recorder.record(f'TCP binary (batch={args.binary_batch})', time.perf_counter() - scheduled_at, ok, len(batch))
+        return len(batch)
+
+    _paced(rate, stop, send_one)
+
+
+def dashboard_worker(args, recorder, stop, rng):
+    http_driver = HttpDriver(args.url, args.timeout)
+
+    def poll(scheduled_at):
+        path = rng.choice(DASHBOARD_PATHS)
+        ok = http_driver.request('GET', path)
+        recorder.record(f'GET {path}', time.perf_counter() - scheduled_at, ok)
+        return 1
+
+    _paced(args.dashboard_rate, stop, poll)
+
+
+def run(args):
+    fleet = build_fleet(args.sensors, args.seed)
+    recorder = Recorder()
+    stop = threading.Event()
+    rng = random.Random(args.seed)
+    threads = []
+
+    ingest = any(t in args.targets for t in ('data', 'predict', 'binary'))
+    if ingest:
+        # Each worker owns a disjoint slice of the fleet so sequences stay per-sensor,
+        # which needs at least one sensor per worker
+        workers = min(args.workers, len(fleet))
+        if workers < args.workers:
+            print(f"⚠️ Only {len(fleet)} sensors, using {workers} ingest workers")
+        for i in range(workers):
+            threads.append(threading.Thread(
+                target=ingest_worker, args=(args, fleet[i::workers], args.rate / workers, recorder, stop,
+                                            random.Random(rng.random())), daemon=True))
+    if 'dashboards' in args.targets:
+        for _ in range(args.dashboard_workers):
+            threads.append(threading.Thread(
+                target=dashboard_worker, args=(args, recorder, stop, random.Random(rng.random())), daemon=True))
+
+    print(f"🚀 Driving {args.url} with {len(fleet)} sensors at {args.rate} readings/s "
+          f"for {args.duration}s (targets: {', '.join(args.targets)})")
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for t in threads:
+        t.join(timeout=args.timeout + 1)
+    elapsed = time.perf_counter() - start
+    recorder.report(elapsed)
+
+    if ingest:
+        with recorder.lock:
+            achieved = sum(n for name, n in recorder.readings.items() if not name.startswith('GET ')) / elapsed
+        shortfall = 1.0 - achieved / args.rate
+        if shortfall > 0.05:
+            print(f"\n⚠️ Achieved {achieved:.1f} of {args.rate:.1f} readings/s ({shortfall:.0%} short): "
+                  f"the server could not keep up, latencies include the backlog")
+        else:
+            print(f"\n✅ Achieved {achieved:.1f} of {args.rate:.1f} readings/s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic sensor fleet and load driver")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the running app')
+    parser.add_argument('--sensors', type=int, default=50, help='Number of simulated sensors')
+    parser.add_argument('--rate', type=float, default=100.0, help='Aggregate readings per second')
+    parser.add_argument('--duration', type=float, default=30.0, help='Test length in seconds')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent ingest connections')
+    parser.add_argument('--targets', default='data,predict,dashboards',
+                        help='Comma-separated: data, predict, binary, dashboards')
+    parser.add_argument('--dashboard-workers', type=int, default=2)
+    parser.add_argument('--dashboard-rate', type=float, default=2.0, help='Polls per second per dashboard worker')
+    parser.add_argument('--binary-port', type=int, default=9000, help='BINARY_TCP_PORT of the app')
+    parser.add_argument('--binary-batch', type=int, default=64, help='Readings per binary batch')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    args.targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
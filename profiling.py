@@ -0,0 +1,162 @@
+"""
+On-demand request profiling with collapsed-stack (flamegraph) output.
+
+Enabled with environment variables; nothing is hooked into the app when
+PROFILE_ROUTES is unset:
+
+    PROFILE_ROUTES       comma-separated path prefixes to profile, or "*"
+    PROFILE_SAMPLE_RATE  fraction of matching requests to profile (default 0.01)
+    PROFILE_MODE         "sampling" (stack snapshots) or "deterministic" (every call)
+    PROFILE_INTERVAL_MS  sampling interval (default 5)
+    PROFILE_TOKEN        token required in X-Admin-Token to read results
+                         (ADMIN_TOKEN, if set, takes precedence)
+
+Stacks are aggregated across requests in the collapsed format read by
+flamegraph.pl and speedscope: ``frame;frame;frame count``. In sampling mode
+the count is the number of samples; in deterministic mode it is self time
+in microseconds.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class RequestProfiler:
+    def __init__(self, routes, sample_rate=0.01, mode='sampling', interval=0.005):
+        if mode not in ('sampling', 'deterministic'):
+            raise ValueError(f'Unknown profiling mode: {mode}')
+        self.routes = [r for r in routes if r]
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self.stacks = Counter()
+        self.profiled_requests = 0
+        self._lock = threading.Lock()
+        self._active = {}  # thread ident -> route label, for the sampler
+        self._wake = threading.Event()
+        self._sampler = None
+
+    @classmethod
+    def from_env(cls):
+        routes = os.environ.get('PROFILE_ROUTES')
+        if not routes:
+            return None
+        return cls(
+            routes.split(','),
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0.01')),
+            mode=os.environ.get('PROFILE_MODE', 'sampling'),
+            interval=float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000.0
+        )
+
+    def install(self, app):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        print(f"✅ Request profiler enabled ({self.mode}, {self.sample_rate:.1%} of {', '.join(self.routes)})")
+
+    def _wants(self, path):
+        if random.random() >= self.sample_rate:
+            return False
+        return any(r == '*' or path.startswith(r) for r in self.routes)
+
+    def _before_request(self):
+        if not self._wants(request.path):
+            return
+        label = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        g._profile_label = label
+        if self.mode == 'sampling':
+            self._start_sampling(label)
+        else:
+            g._profile_tracer = _CallTracer(label)
+            sys.setprofile(g._profile_tracer)
+
+    def _teardown_request(self, exc):
+        label = g.pop('_profile_label', None)
+        if label is None:
+            return
+        if self.mode == 'sampling':
+            with self._lock:
+                self._active.pop(threading.get_ident(), None)
+                self.profiled_requests += 1
+        else:
+            sys.setprofile(None)
+            tracer = g.pop('_profile_tracer')
+            with self._lock:
+                self.stacks.update(tracer.stacks)
+                self.profiled_requests += 1
+
+    def _start_sampling(self, label):
+        with self._lock:
+            self._active[threading.get_ident()] = label
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+                self._sampler.start()
+        self._wake.set()
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                active = dict(self._active)
+                if not active:
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            samples = []
+            for ident, label in active.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                names.append(label)
+                samples.append(';'.join(reversed(names)))
+            with self._lock:
+                self.stacks.update(samples)
+            time.sleep(self.interval)
+
+    def collapsed(self):
+        with self._lock:
+            return ''.join(f"{stack} {int(count)}\n" for stack, count in self.stacks.most_common() if count >= 1)
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.profiled_requests = 0
+
+
+class _CallTracer:
+    """sys.setprofile callback recording self time per call stack"""
+
+    def __init__(self, label):
+        self.stacks = Counter()
+        self._names = [label]
+        self._frames = []  # [start, child time] per open call
+        self._clock = time.perf_counter
+
+    def __call__(self, frame, event, arg):
+        if event == 'call' or event == 'c_call':
+            name = _frame_name(frame.f_code) if event == 'call' else f"<builtin>:{getattr(arg, '__qualname__', arg)}"
+            self._names.append(name)
+            self._frames.append([self._clock(), 0.0])
+        elif self._frames:
+            # 'return', 'c_return' and 'c_exception' close the innermost open call.
+            # Returns from frames entered before profiling began find no open call.
+            start, child = self._frames.pop()
+            elapsed = self._clock() - start
+            self.stacks[';'.join(self._names)] += (elapsed - child) * 1e6
+            self._names.pop()
+            if self._frames:
+                self._frames[-1][1] += elapsed
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Sharding of ingest and storage by sensor_id
+
+Readings are routed to shard nodes by consistent hashing on sensor_id. Every
+shard is an ordinary app.py process with its own CSV, detector state and
+model directory. A router process (app.py started with SHARD_NODES set)
+forwards ingest to the owning shard and scatter-gathers dashboard queries.
+Sensor history and /download are not merged across shards; the router
+answers them with 501 and they are read from the shards directly.
+
+Rebalancing copies each moved sensor to its new owner and then deletes it
+from the old one, so stop the router (and any direct ingest into the shards)
+before running it and restart the router with the new SHARD_NODES after.
+The shard maintenance endpoints it calls only exist on processes started
+with SHARD_NODE=1 and require X-Admin-Token to match their ADMIN_TOKEN;
+`cluster` generates a token for its shards when ADMIN_TOKEN is unset.
+
+Usage:
+    python sharding.py cluster --shards 3              # local router + shards
+    python sharding.py rebalance --old URL,URL --new URL,URL,URL [--token TOKEN]
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import secrets
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes, vnodes=128):
+        self.nodes = list(nodes)
+        self.vnodes = vnodes
+        self._ring = sorted(
+            (self._hash(f'{node}#{i}'), node)
+            for node in self.nodes
+            for i in range(vnodes)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def node_for(self, key):
+        if not self._ring:
+            raise ValueError('Hash ring has no nodes')
+        index = bisect.bisect(self._keys, self._hash(str(key))) % len(self._ring)
+        return self._ring[index][1]
+
+
+class ShardRouter:
+    """Forwards requests to shard nodes and merges scatter-gather results"""
+
+    def __init__(self, nodes, timeout=5.0, admin_token=None):
+        self.nodes = [node.rstrip('/') for node in nodes]
+        self.ring = HashRing(self.nodes)
+        self.timeout = timeout
+        self.admin_token = admin_token
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.nodes)))
+
+    def node_for(self, sensor_id):
+        return self.ring.node_for(sensor_id)
+
+    def forward(self, node, path, payload=None, method=None):
+        """Send a request to one node and return (status, body bytes)"""
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(node + path, data=data, method=method or ('POST' if data else 'GET'))
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        if self.admin_token:
+            req.add_header('X-Admin-Token', self.admin_token)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except OSError as e:
+            return 502, json.dumps({'error': f'Shard {node} unavailable: {e}'}).encode('utf-8')
+
+    def gather(self, path):
+        """GET ``path`` from every node; unreachable or failing shards are skipped"""
+        results = []
+        for node, (status, body) in zip(self.nodes, self._pool.map(lambda n: self.forward(n, path), self.nodes)):
+            if status != 200:
+                print(f"⚠️ Shard {node} failed for {path}: HTTP {status}")
+                continue
+            results.append(json.loads(body))
+        return results
+
+    def sensors(self):
+        """Merge /api/sensors, keeping the latest reading per sensor type"""
+        latest = {}
+        for shard in self.gather('/api/sensors'):
+            for sensor in shard:
+                current = latest.get(sensor['id'])
+                if current is None or sensor['timestamp'] > current['timestamp']:
+                    latest[sensor['id']] = sensor
+        return list(latest.values())
+
+    def dashboard_data(self, limit=100):
+        """Merge /dashboard-data, keeping the newest ``limit`` readings overall"""
+        rows = [row for shard in self.gather('/dashboard-data') for row in shard]
+        rows.sort(key=lambda row: row['timestamp'])
+        return rows[-limit:]
+
+
+def rebalance(old_nodes, new_nodes, timeout=30.0, admin_token=None):
+    """Move only the sensors whose owner changes between two ring layouts.
+
+    Each moved sensor's rows are exported from the old owner as NDJSON,
+    imported on the new owner and then dropped from the old one. A sensor is
+    only dropped once the new owner confirms it imported every exported row,
+    and the old owner refuses the drop if the sensor gained rows since the
+    export. The router must be stopped while this runs (see module docstring).
+    """
+    old_nodes = [n.rstrip('/') for n in old_nodes]
+    new_ring = HashRing([n.rstrip('/') for n in new_nodes])
+    router = ShardRouter(old_nodes, timeout=timeout, admin_token=admin_token)
+    moved = failed = 0
+    for node in old_nodes:
+        status, body = router.forward(node, '/api/shard/sensor-ids')
+        if status != 200:
+            print(f"❌ Could not list sensors on {node}: HTTP {status}")
+            failed += 1
+            continue
+        for sensor_id in json.loads(body):
+            target = new_ring.node_for(sensor_id)
+            if target == node:
+                continue
+            query = urllib.parse.urlencode({'sensor_id': sensor_id, 'format': 'ndjson'})
+            status, rows = router.forward(node, f'/download?{query}')
+            if status != 200:
+                print(f"❌ Export of {sensor_id} from {node} failed: HTTP {status}")
+                failed += 1
+                continue
+            records = [json.loads(line) for line in rows.splitlines() if line.strip()]
+            if not records:
+                # Listed but nothing exported: the CSV and the listing disagree, leave it alone
+                print(f"❌ {sensor_id} is listed on {node} but exported 0 rows, skipping")
+                failed += 1
+                continue
+            status, body = router.forward(target, '/api/shard/import', {'rows': records})
+            imported = json.loads(body).get('imported') if status == 200 else None
+            if imported != len(records):
+                print(f"❌ Import of {sensor_id} into {target} failed: HTTP {status}, "
+                      f"{imported} of {len(records)} rows imported; {node} keeps its copy")
+                failed += 1
+                continue
+            status, body = router.forward(node, '/api/shard/drop',
+                                          {'sensor_ids': [sensor_id], 'expected_rows': len(records)})
+            if status != 200:
+                print(f"❌ Drop of {sensor_id} from {node} failed: HTTP {status}; "
+                      f"it is now on both {node} and {target}")
+                failed += 1
+                continue
+            moved += 1
+            print(f"↪️  {sensor_id}: {node} → {target} ({len(records)} rows)")
+    if failed:
+        print(f"⚠️ Rebalance finished with {failed} failures: {moved} sensors moved")
+    else:
+        print(f"✅ Rebalance complete: {moved} sensors moved")
+    return moved
+
+
+def run_cluster(shards, base_port, router_port, data_dir):
+    """Start ``shards`` shard processes and one router, each on its own port"""
+    from train_model import load_model, save_model
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.abspath(data_dir)  # the shards run with cwd=here
+    os.makedirs(data_dir, exist_ok=True)
+    nodes = [f'http://127.0.0.1:{base_port + i}' for i in range(shards)]
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        admin_token = secrets.token_urlsafe(24)
+        print(f"🔑 Shard admin token (pass to rebalance with --token): {admin_token}")
+    procs = []
+    for i, node in enumerate(nodes):
+        # Each shard retrains on its own readings, so it gets its own copy of the model
+        model_dir = os.path.join(data_dir, f'model_{i}')
+        if not os.path.exists(model_dir):
+            save_model(*load_model(os.path.join(here, 'model')), model_dir)
+        env = dict(os.environ, PORT=str(base_port + i), SENSOR_CSV=os.path.join(data_dir, f'shard_{i}.csv'),
+                   MODEL_DIR=model_dir, SHARD_NODE='1', ADMIN_TOKEN=admin_token)
+        env.pop('SHARD_NODES', None)
+        procs.append(subprocess.Popen([sys.executable, os.path.join(here, 'app.py')], env=env, cwd=here))
+    env = dict(os.environ, PORT=str(router_port), SHARD_NODES=','.join(nodes))
+    env.pop('SHARD_NODE', None)
+    procs.append(subprocess.Popen([sys.executable, os.path.join(here, 'app.py')], env=env, cwd=here))
+    print(f"🚀 Router on http://127.0.0.1:{router_port} → shards {', '.join(nodes)}")
+    try:
+        while all(p.poll() is None for p in procs):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensor sharding tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    cluster = sub.add_parser('cluster', help='Run a local router and shard processes')
+    cluster.add_argument('--shards', type=int, default=3)
+    cluster.add_argument('--base-port', type=int, default=5001)
+    cluster.add_argument('--router-port', type=int, default=5000)
+    cluster.add_argument('--data-dir', default='shards')
+    move = sub.add_parser('rebalance', help='Move sensors after changing the shard list')
+    move.add_argument('--old', required=True, help='Comma-separated shard URLs before the change')
+    move.add_argument('--new', required=True, help='Comma-separated shard URLs after the change')
+    move.add_argument('--token', default=os.environ.get('ADMIN_TOKEN'), help='Shard admin token (default $ADMIN_TOKEN)')
+    args = parser.parse_args()
+
+    if args.command == 'cluster':
+        run_cluster(args.shards, args.base_port, args.router_port, args.data_dir)
+    else:
+        rebalance(args.old.split(','), args.new.split(','), admin_token=args.token)
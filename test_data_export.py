@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Checks for the streaming export: filters, every format, gzip, messy CSV
+cells and the snapshot read that ignores rows appended mid-export
+"""
+
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_CSV = """timestamp,sensor_id,sensor_type,value,anomaly
+2025-01-01 00:00:00,1001,mq5_01,120.5,0
+2025-01-01 01:00:00,1001,mq5_01,980.0,1
+2025-01-01 02:00:00,1002,temp_01,21.5,
+2025-01-01 03:00:00,1001,mq5_01,,0
+not a time,1001,mq5_01,130.0,0
+2025-01-01 04:00:00,,mq5_01,140.0,1
+"""
+
+try:
+    import pandas as pd
+    from data_export import ExportFilter, iter_filtered_chunks, parquet_available, stream_export
+
+    tmp_dir = tempfile.mkdtemp(prefix='export_test_')
+    csv_file = os.path.join(tmp_dir, 'sensor_data.csv')
+    with open(csv_file, 'w') as f:
+        f.write(SAMPLE_CSV)
+
+    def export(fmt='csv', use_gzip=False, **kwargs):
+        data = b''.join(stream_export(csv_file, ExportFilter(**kwargs), fmt, use_gzip))
+        return gzip.decompress(data) if use_gzip else data
+
+    # Numeric-looking ids match as strings
+    rows = export('ndjson', sensor_id='1001').decode('utf-8').splitlines()
+    records = [json.loads(line) for line in rows]
+    print(f"🔎 sensor_id=1001 → {len(records)} rows")
+    assert len(records) == 4, "Numeric sensor ids did not match"
+    assert all(r['sensor_id'] == '1001' for r in records)
+
+    # Blank cells come out as null, a blank anomaly flag as 0
+    records = [json.loads(line) for line in export('ndjson').decode('utf-8').splitlines()]
+    assert len(records) == 6
+    assert records[2]['anomaly'] == 0, "Blank anomaly cell was not treated as normal"
+    assert records[3]['value'] is None, "Blank value was not exported as null"
+    assert records[4]['timestamp'] is None, "Unparseable timestamp was not exported as null"
+    assert records[5]['sensor_id'] is None, "Blank sensor id was not exported as null"
+    print("✅ NDJSON handles blank and malformed cells")
+
+    # Time bounds and anomalies_only
+    frame = pd.read_csv(io.BytesIO(export(start='2025-01-01 01:00:00', end='2025-01-01 02:00:00')))
+    assert len(frame) == 2, "Time bounds filtered the wrong rows"
+    frame = pd.read_csv(io.BytesIO(export(anomalies_only=True)))
+    assert frame['anomaly'].tolist() == [1, 1], "anomalies_only filtered the wrong rows"
+    print("✅ Time range and anomalies_only filters")
+
+    # Timezone-aware and garbage bounds are rejected before any bytes are sent
+    for bad in ('2025-01-01T00:00:00+02:00', 'garbage'):
+        try:
+            ExportFilter(start=bad)
+            raise AssertionError(f"Bound {bad!r} was accepted")
+        except ValueError:
+            pass
+    print("✅ Timezone-aware and invalid bounds rejected")
+
+    # gzip wraps every format
+    assert export('csv', use_gzip=True) == export('csv'), "gzip CSV does not round-trip"
+    assert export('ndjson', use_gzip=True) == export('ndjson'), "gzip NDJSON does not round-trip"
+    print("✅ gzip output round-trips")
+
+    if parquet_available():
+        table = pd.read_parquet(io.BytesIO(export('parquet')))
+        assert len(table) == 6 and table['anomaly'].tolist() == [0, 1, 0, 0, 0, 1]
+        assert table['sensor_id'].isna().sum() == 1, "Blank sensor id was not written as null"
+        table = pd.read_parquet(io.BytesIO(export('parquet', use_gzip=True)))
+        assert len(table) == 6
+        print("✅ Parquet export (plain and gzip)")
+    else:
+        print("⚠️ pyarrow not installed, skipping Parquet export")
+
+    # Rows appended after the export started are not read, even mid-stream
+    chunks = iter_filtered_chunks(csv_file, ExportFilter(), chunksize=2)
+    first = next(chunks)
+    with open(csv_file, 'a') as f:
+        f.write("2025-01-01 05:00:00,1003,mq5_01,150.0,0\n" * 10)
+    total = len(first) + sum(len(chunk) for chunk in chunks)
+    print(f"📸 Export started before the append saw {total} rows")
+    assert total == 6, "Export read rows appended after it started"
+
+    os.remove(csv_file)
+    os.rmdir(tmp_dir)
+    print("\n🎉 Data export checks passed!")
+
+except Exception as e:
+    print(f"❌ Error: {e}")
+    import traceback
+    traceback.print_exc()
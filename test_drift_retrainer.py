@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+End-to-end check for drift retraining: a long steady baseline, a sudden
+shift, a background retrain, and no drift left against the swapped-in model
+
+Runs against a copy of the model in a temporary directory, so model/ is
+never touched.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def feed(monitor, rng, mean, std, count):
+    for value in rng.normal(mean, std, count):
+        monitor.observe('mq5_01', value)
+
+
+if __name__ == "__main__":
+    model_dir = tempfile.mkdtemp(prefix='drift_test_')
+    try:
+        import numpy as np
+        from drift_retrainer import DriftMonitor
+        from train_model import load_model, model_paths, save_model
+
+        save_model(*load_model('model'), model_dir)
+        swaps = []
+        monitor = DriftMonitor(model_dir, check_interval=3600, cooldown=0,
+                               on_swap=lambda model, scaler: swaps.append(scaler))
+        rng = np.random.default_rng(42)
+        mean, std = float(monitor.scaler.mean_[0]), float(monitor.scaler.scale_[0])
+        shifted = mean + 10 * std
+
+        # A long steady run must not dilute a later shift
+        feed(monitor, rng, mean, std, 20000)
+        before = monitor.check()['features']['mq5_01']
+        print(f"📊 Baseline: mean_shift={before['mean_shift']:.2f}")
+        assert 'mean_shift' not in before['drift'], "Steady baseline reported a mean shift"
+
+        feed(monitor, rng, shifted, std, 1000)
+        report = monitor.check()
+        stats = report['features']['mq5_01']
+        print(f"📈 After shift: mean_shift={stats['mean_shift']:.2f}, drift={stats['drift']}")
+        assert 'mean_shift' in stats['drift'], "Shift was not detected"
+        assert report['drift_since'] is not None
+
+        # The retrain fits only readings from after the shift was detected
+        assert not monitor.trigger_retrain(), "Retrained before collecting post-drift samples"
+        feed(monitor, rng, shifted, std, 1000)
+        assert monitor.trigger_retrain(), "Retrain did not start"
+        deadline = time.time() + 120
+        while monitor.retrain_count == 0 and time.time() < deadline:
+            time.sleep(0.2)
+        assert monitor.retrain_count == 1 and swaps, "Retrained model was not swapped in"
+        new_mean = float(monitor.scaler.mean_[0])
+        print(f"🔁 Retrained scaler mean {new_mean:.1f} (shifted data mean {shifted:.1f})")
+        assert abs(new_mean - shifted) < 0.5 * std, "Retrained model did not move to the new baseline"
+
+        # Model and scaler come from the same saved version
+        model_path, scaler_path = model_paths(model_dir)
+        assert os.path.dirname(model_path) == os.path.dirname(scaler_path) != model_dir
+
+        feed(monitor, rng, shifted, std, 1000)
+        report = monitor.check()
+        stats = report['features']['mq5_01']
+        print(f"✅ After swap: mean_shift={stats['mean_shift']:.2f}, std_ratio={stats['std_ratio']:.2f}, "
+              f"anomaly_rate={stats['anomaly_rate']:.3f}, drift={stats['drift']}")
+        assert not report['drift'], f"Drift remained after retraining: {stats['drift']}"
+
+        print("\n🎉 Drift retraining checks passed!")
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
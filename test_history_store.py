@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Checks for the array-backed history store: late and back-filled readings
+against a pandas reference, anomaly bits across byte boundaries, window and
+tail queries, and rows skipped on load
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import numpy as np
+    import pandas as pd
+    from history_store import SensorHistoryStore, _Series
+
+    # Random in-order, late and batched inserts must match a stable sort by timestamp
+    rng = random.Random(7)
+    for trial in range(200):
+        series = _Series(0, 0, capacity=4)
+        reference = []
+        for _ in range(rng.randrange(1, 120)):
+            if rng.random() < 0.3:
+                batch = sorted((rng.randrange(0, 200), rng.random(), rng.randrange(2)) for _ in range(rng.randrange(1, 20)))
+                ts, values, flags = zip(*batch)
+                series.extend(np.array(ts), np.array(values, dtype=np.float32), np.array(flags, dtype=np.uint8))
+                reference.extend(batch)
+            else:
+                reading = (rng.randrange(0, 200), rng.random(), rng.randrange(2))
+                series.append(*reading)
+                reference.append(reading)
+        expected = pd.DataFrame(reference, columns=['ts', 'value', 'anomaly']).sort_values('ts', kind='stable')
+        assert series.timestamps[:series.size].tolist() == expected['ts'].tolist(), "Timestamps out of order"
+        assert np.allclose(series.values[:series.size], expected['value'].astype(np.float32)), "Values misplaced"
+        assert series.anomalies(0, series.size).tolist() == expected['anomaly'].tolist(), "Anomaly bits misplaced"
+    print("✅ Late and batched inserts match a stable sort (200 random series)")
+
+    # Anomaly bits straddling byte boundaries survive growth and a late insert at the front
+    series = _Series(0, 0, capacity=8)
+    flags = np.array([i % 3 == 0 for i in range(37)], dtype=np.uint8)
+    series.extend(np.arange(100, 137), np.zeros(37, dtype=np.float32), flags)
+    series.append(50, 1.0, 1)
+    assert series.anomalies(0, series.size).tolist() == [1] + flags.tolist(), "Bitmap shift broke flags"
+    assert series.anomalies(5, 21).tolist() == flags[4:20].tolist(), "Unaligned bitmap slice is wrong"
+    print("✅ Anomaly bitmap across byte boundaries")
+
+    # Store queries across several sensors of one type
+    store = SensorHistoryStore(initial_capacity=2)
+    base = datetime(2025, 1, 1)
+    for i in range(60):
+        store.append(base + timedelta(minutes=i), f'dev{i % 3}', 'mq5_01', 100 + i, int(i % 10 == 0))
+    store.append(base + timedelta(minutes=5, seconds=30), 'dev0', 'mq5_01', 999, 1)  # late reading
+    assert len(store) == 61
+    tail = store.tail(5, sensor_type='mq5_01')
+    assert [r.value for r in tail] == [155.0, 156.0, 157.0, 158.0, 159.0], "tail() returned the wrong readings"
+    window = store.window(base + timedelta(minutes=5), base + timedelta(minutes=6), sensor_type='mq5_01')
+    assert [r.value for r in window] == [105.0, 999.0, 106.0], "window() missed the late reading"
+    assert store.window(sensor_id='dev1', limit=2)[-1].value == 158.0
+    store.remove_sensors(['dev1'])
+    assert store.sensor_ids() == ['dev0', 'dev2']
+    print("✅ tail, window and remove_sensors")
+
+    # Unparseable rows are counted, and numeric ids load as the same strings the CSV holds
+    tmp_dir = tempfile.mkdtemp(prefix='history_test_')
+    csv_file = os.path.join(tmp_dir, 'sensor_data.csv')
+    with open(csv_file, 'w') as f:
+        f.write("timestamp,sensor_id,sensor_type,value,anomaly\n"
+                "2025-01-01 00:00:00,1001,mq5_01,120.5,0\n"
+                "not a time,1001,mq5_01,130.0,0\n"
+                "2025-01-01 00:02:00,,mq5_01,abc,1\n"
+                "2025-01-01 00:03:00,1002,mq5_01,140.0,\n")
+    store = SensorHistoryStore()
+    loaded = store.load_csv(csv_file)
+    print(f"📥 Loaded {loaded} rows, skipped {store.skipped}")
+    assert loaded == 2 and store.skipped == 2, "Skipped rows were not counted"
+    assert store.sensor_ids() == ['1001', '1002'], f"Unexpected ids: {store.sensor_ids()}"
+    os.remove(csv_file)
+    os.rmdir(tmp_dir)
+
+    print("\n🎉 History store checks passed!")
+
+except Exception as e:
+    print(f"❌ Error: {e}")
+    import traceback
+    traceback.print_exc()
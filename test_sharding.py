@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Checks for consistent-hash sharding: balance across shards and how many
+sensors move when a shard is added
+"""
+
+import os
+import sys
+from collections import Counter
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from sharding import HashRing
+
+    sensor_ids = [f'sensor_{i:05d}' for i in range(20000)]
+    nodes = [f'http://127.0.0.1:{5001 + i}' for i in range(3)]
+
+    ring = HashRing(nodes)
+    counts = Counter(ring.node_for(s) for s in sensor_ids)
+    print("📊 Sensors per shard (3 shards):")
+    for node in nodes:
+        print(f"   {node}: {counts[node]} ({counts[node] / len(sensor_ids):.1%})")
+    assert max(counts.values()) / min(counts.values()) < 1.3, "Shards are badly unbalanced"
+
+    grown = HashRing(nodes + ['http://127.0.0.1:5004'])
+    moved = [s for s in sensor_ids if ring.node_for(s) != grown.node_for(s)]
+    print(f"↪️  Adding a 4th shard moves {len(moved) / len(sensor_ids):.1%} of sensors (ideal 25%)")
+    assert all(grown.node_for(s) == 'http://127.0.0.1:5004' for s in moved), "Sensors moved between old shards"
+    assert len(moved) / len(sensor_ids) < 0.35, "Too many sensors moved"
+
+    print("\n🎉 Sharding checks passed!")
+
+except Exception as e:
+    print(f"❌ Error: {e}")
+    import traceback
+    traceback.print_exc()
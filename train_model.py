@@ -3,48 +3,98 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import shutil
+import time
 
 CSV_PATH = 'sensor_data.csv'
+MODEL_DIR = 'model'
+MODEL_FILE = 'isolation_forest_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+KEEP_VERSIONS = 3
 
-# Load dataset
-df = pd.read_csv(CSV_PATH)
 
-# Verify required columns
-required_columns = {'timestamp', 'sensor_type', 'value'}
-if not required_columns.issubset(df.columns):
-    raise ValueError(f"CSV is missing required columns: {required_columns - set(df.columns)}")
+def fit_model(pivot_df, contamination=0.05):
+    """Fit the scaler and Isolation Forest on a feature DataFrame"""
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(pivot_df)
 
-# Filter to include only MQ-5 sensor data
-df = df[df['sensor_type'] == 'mq5_01']
+    model = IsolationForest(contamination=contamination, random_state=42)
+    model.fit(X_scaled)
+    return model, scaler
 
-# Ensure 'value' column is numeric
-df = df[pd.to_numeric(df['value'], errors='coerce').notnull()]
-df['value'] = df['value'].astype(float)
 
-# Pivot the data: for one sensor type, set index and rename
-pivot_df = df.set_index('timestamp')[['value']]
-pivot_df.columns = ['mq5_01']
-pivot_df = pivot_df.fillna(0)
+def model_paths(model_dir=MODEL_DIR):
+    """Paths of the live model and scaler pair.
 
-if pivot_df.empty:
-    raise ValueError("No valid MQ-5 numeric data available for training.")
+    Saved pairs live in ``versions/<name>/`` and the CURRENT file names the
+    live one, so a reader always gets a model and scaler trained together.
+    Without CURRENT the files at the top of ``model_dir`` are used.
+    """
+    try:
+        with open(os.path.join(model_dir, 'CURRENT')) as f:
+            version_dir = os.path.join(model_dir, 'versions', f.read().strip())
+    except FileNotFoundError:
+        version_dir = model_dir
+    return os.path.join(version_dir, MODEL_FILE), os.path.join(version_dir, SCALER_FILE)
 
-print(f"Training only on these features: {list(pivot_df.columns)}")
 
-# Scale features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(pivot_df)
+def load_model(model_dir=MODEL_DIR):
+    model_path, scaler_path = model_paths(model_dir)
+    return joblib.load(model_path), joblib.load(scaler_path)
 
-# Train Isolation Forest model
-model = IsolationForest(contamination=0.05, random_state=42)
-model.fit(X_scaled)
 
-# Ensure 'model' directory exists
-if not os.path.exists('model'):
-    os.makedirs('model')
+def save_model(model, scaler, model_dir=MODEL_DIR):
+    """Write model and scaler as a new version and switch CURRENT to it with one atomic replace"""
+    versions = os.path.join(model_dir, 'versions')
+    version = f'v{time.time_ns()}'
+    os.makedirs(os.path.join(versions, version))
+    joblib.dump(model, os.path.join(versions, version, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(versions, version, SCALER_FILE))
 
-# Save the trained model and scaler
-joblib.dump(model, 'model/isolation_forest_model.pkl')
-joblib.dump(scaler, 'model/scaler.pkl')
+    pointer = os.path.join(model_dir, 'CURRENT')
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(pointer + '.tmp', pointer)
 
-print("✅ Model and scaler saved successfully in 'model/' folder!")
+    # Older versions stay around briefly for readers that resolved CURRENT just before the switch
+    for old in sorted(os.listdir(versions))[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(versions, old), ignore_errors=True)
+    return version
+
+
+def main():
+    # Load dataset
+    df = pd.read_csv(CSV_PATH)
+
+    # Verify required columns
+    required_columns = {'timestamp', 'sensor_type', 'value'}
+    if not required_columns.issubset(df.columns):
+        raise ValueError(f"CSV is missing required columns: {required_columns - set(df.columns)}")
+
+    # Filter to include only MQ-5 sensor data
+    df = df[df['sensor_type'] == 'mq5_01']
+
+    # Ensure 'value' column is numeric
+    df = df[pd.to_numeric(df['value'], errors='coerce').notnull()]
+    df['value'] = df['value'].astype(float)
+
+    # Pivot the data: for one sensor type, set index and rename
+    pivot_df = df.set_index('timestamp')[['value']]
+    pivot_df.columns = ['mq5_01']
+    pivot_df = pivot_df.fillna(0)
+
+    if pivot_df.empty:
+        raise ValueError("No valid MQ-5 numeric data available for training.")
+
+    print(f"Training only on these features: {list(pivot_df.columns)}")
+
+    model, scaler = fit_model(pivot_df)
+
+    # Save the trained model and scaler
+    save_model(model, scaler)
+
+    print("✅ Model and scaler saved successfully in 'model/' folder!")
+
+
+if __name__ == "__main__":
+    main()